@@ -0,0 +1,243 @@
+"""
+Incrementally maintained counters behind the /analytics endpoints.
+
+Every ORM flush that inserts, updates or deletes a User, SupportTicket,
+Product, Order or OrderItem adds the matching deltas to rows of
+analytics_counters inside the same transaction, so the endpoints read a
+handful of rows instead of scanning and grouping the source tables.
+Bulk Query.update()/delete() calls bypass these hooks; code that changes
+counted columns that way must call `add_deltas` itself, and
+`rebuild_counters` (flask rebuild-analytics) recomputes everything from
+scratch for reconciliation.
+"""
+from collections import defaultdict
+from sqlalchemy import case, event, func, inspect, literal, or_, select
+from models import db, AnalyticsCounter, User, SupportTicket, Product, Order, OrderItem
+
+LOW_STOCK_THRESHOLD = 5
+
+counters = AnalyticsCounter.__table__
+
+
+def _flag(value):
+    return 'none' if value is None else str(bool(value)).lower()
+
+
+def parse_flag(value):
+    return None if value == 'none' else value == 'true'
+
+
+def _user_counters(user):
+    return {
+        'users.total': 1,
+        f'users.role:{user["role"]}': 1,
+        f'users.approved:{_flag(user["is_approved"])}': 1,
+    }
+
+
+def _ticket_counters(ticket):
+    return {
+        'tickets.total': 1,
+        f'tickets.status:{ticket["status"]}': 1,
+    }
+
+
+def _product_counters(product):
+    category = 'none' if product['category_id'] is None else product['category_id']
+    stock = product['stock']
+    return {
+        'products.total': 1,
+        f'products.category:{category}': 1,
+        'products.popular': 1 if product['is_popular'] else 0,
+        'products.low_stock': 1 if stock is not None and stock < LOW_STOCK_THRESHOLD else 0,
+    }
+
+
+def _order_counters(order):
+    return {
+        'orders.total': 1,
+        f'orders.status:{order["status"]}': 1,
+    }
+
+
+def _order_item_counters(item):
+    return {'order_items.revenue': item['total_price'] or 0}
+
+
+# model -> (attributes the counters depend on, attributes -> counter contributions)
+TRACKED = {
+    User: (('role', 'is_approved'), _user_counters),
+    SupportTicket: (('status',), _ticket_counters),
+    Product: (('category_id', 'is_popular', 'stock'), _product_counters),
+    Order: (('status',), _order_counters),
+    OrderItem: (('total_price',), _order_item_counters),
+}
+
+
+def _values(obj, attrs, old):
+    state = inspect(obj)
+    values = {}
+    for attr in attrs:
+        history = state.attrs[attr].history
+        if old and history.deleted:
+            values[attr] = history.deleted[0]
+        else:
+            values[attr] = getattr(obj, attr)
+    return values
+
+
+def _add(deltas, obj, old, sign):
+    attrs, contribute = TRACKED[type(obj)]
+    for name, amount in contribute(_values(obj, attrs, old)).items():
+        deltas[name] += sign * amount
+
+
+def _collect_changes(session):
+    # Before the flush, while deleted rows can still be loaded
+    deltas = defaultdict(float)
+    for obj in session.deleted:
+        if type(obj) in TRACKED:
+            _add(deltas, obj, old=True, sign=-1)
+
+    for obj in session.dirty:
+        if type(obj) in TRACKED:
+            state = inspect(obj)
+            if any(state.attrs[attr].history.deleted for attr in TRACKED[type(obj)][0]):
+                _add(deltas, obj, old=True, sign=-1)
+                _add(deltas, obj, old=False, sign=1)
+    return deltas
+
+
+def _collect_new(session, deltas):
+    # After the flush, once column defaults have been applied
+    for obj in session.new:
+        if type(obj) in TRACKED:
+            _add(deltas, obj, old=False, sign=1)
+    return {name: delta for name, delta in deltas.items() if delta}
+
+
+def upsert_increment(connection, table, keys, rows):
+    """
+    Add each row's non-key columns onto the existing row with the same `keys`,
+    inserting it if missing. One INSERT .. ON CONFLICT DO UPDATE per batch on
+    SQLite and Postgres; an UPDATE-then-INSERT loop elsewhere.
+    """
+    if not rows:
+        return
+    columns = [c for c in rows[0] if c not in keys]
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table)
+        stmt = stmt.on_conflict_do_update(
+            index_elements=list(keys),
+            set_={c: table.c[c] + getattr(stmt.excluded, c) for c in columns}
+        )
+        connection.execute(stmt, rows)
+        return
+
+    for row in rows:
+        where = [table.c[k] == row[k] for k in keys]
+        result = connection.execute(
+            table.update().where(*where).values({c: table.c[c] + row[c] for c in columns})
+        )
+        if result.rowcount == 0:
+            connection.execute(table.insert().values(row))
+
+
+def add_deltas(connection, deltas):
+    """Apply {counter name: delta} to analytics_counters on `connection`"""
+    upsert_increment(connection, counters, ('name',), [
+        {'name': name, 'value': delta} for name, delta in deltas.items() if delta
+    ])
+
+
+@event.listens_for(db.session, 'before_flush')
+def _collect_counter_changes(session, flush_context, instances):
+    session.info['analytics_deltas'] = _collect_changes(session)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _maintain_counters(session, flush_context):
+    deltas = _collect_new(session, session.info.pop('analytics_deltas', defaultdict(float)))
+    if deltas:
+        add_deltas(session.connection(), deltas)
+
+
+# Load the previous value when a counted attribute is assigned, so the
+# old contribution can be subtracted even if the row was expired
+for _model, (_attrs, _) in TRACKED.items():
+    for _attr in _attrs:
+        event.listen(getattr(_model, _attr), 'set', lambda *args: None, active_history=True)
+
+
+def read_counters(*prefixes):
+    """{name: value} for every counter starting with one of `prefixes` (primary-key range reads)"""
+    rows = db.session.execute(
+        select(counters.c.name, counters.c.value)
+        .where(or_(*[counters.c.name.like(f'{prefix}%') for prefix in prefixes]))
+    ).all()
+    return {name: value for name, value in rows}
+
+
+def grouped(values, prefix, cast=str):
+    """[(group, count)] for counters named `prefix`<group>, skipping empty groups"""
+    return [
+        (cast(name[len(prefix):]), int(value))
+        for name, value in sorted(values.items())
+        if name.startswith(prefix) and value
+    ]
+
+
+def compute_counters():
+    """Every counter recomputed from the source tables"""
+    values = defaultdict(float)
+
+    for role, approved, count in db.session.execute(
+        select(User.role, User.is_approved, func.count()).group_by(User.role, User.is_approved)
+    ):
+        values['users.total'] += count
+        values[f'users.role:{role}'] += count
+        values[f'users.approved:{_flag(approved)}'] += count
+
+    for status, count in db.session.execute(
+        select(SupportTicket.status, func.count()).group_by(SupportTicket.status)
+    ):
+        values['tickets.total'] += count
+        values[f'tickets.status:{status}'] += count
+
+    low_stock = case((Product.stock < LOW_STOCK_THRESHOLD, 1), else_=0)
+    popular = case((Product.is_popular.is_(True), 1), else_=0)
+    for category_id, count, popular_count, low_count in db.session.execute(
+        select(Product.category_id, func.count(), func.sum(popular), func.sum(low_stock))
+        .group_by(Product.category_id)
+    ):
+        category = 'none' if category_id is None else category_id
+        values['products.total'] += count
+        values[f'products.category:{category}'] += count
+        values['products.popular'] += popular_count or 0
+        values['products.low_stock'] += low_count or 0
+
+    values['orders.total'] = 0
+    for status, count in db.session.execute(
+        select(Order.status, func.count()).group_by(Order.status)
+    ):
+        values['orders.total'] += count
+        values[f'orders.status:{status}'] += count
+    values['order_items.revenue'] = db.session.execute(
+        select(func.coalesce(func.sum(OrderItem.total_price), literal(0)))
+    ).scalar()
+    return dict(values)
+
+
+def rebuild_counters():
+    """Replace analytics_counters with freshly computed values"""
+    values = compute_counters()
+    connection = db.session.connection()
+    connection.execute(counters.delete())
+    connection.execute(counters.insert(), [{'name': n, 'value': v} for n, v in values.items()])
+    db.session.commit()
+    return values
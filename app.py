@@ -1,44 +1,17 @@
-import os
-from datetime import timedelta
-from dotenv import load_dotenv
-from flask import Flask, request, jsonify
+from flask import Flask
 from flask_migrate import Migrate
-from flask_restful import Api
 from flask_cors import CORS
 from flask_bcrypt import Bcrypt
 from flask_jwt_extended import JWTManager
 
-from models import db, OrderItem, Transaction
-# ==== Import and Register Resources
-from resources.auth import AuthResource
-from resources.cart import CartResource, CartItemResource
-from resources.product_resource import ProductListResource
-from resources.order_resource import OrderListResource, OrderResource
-from resources.analytics_resource import UserAnalyticsResource, TicketStatusAnalyticsResource, ProductStatusAnalyticsResource
-from resources.admin_resource import AdminUserResource, AdminProductResource, AdminOrderResource, AdminTicketResource, AdminDashboardResource
-from resources.transaction_resource import TransactionResource, TransactionDetailResource, TransactionCallbackResource
-from resources.mpesa_resource import MpesaSTKPushResource
-from mpesa_stk import lipa_na_mpesa
-
-# Load .env variables
-load_dotenv()
-
-# Initialize Flask app
-app = Flask(__name__)
-
-# Configurations
-app.config["SQLALCHEMY_DATABASE_URI"] = os.environ.get("DATABASE_URI")
-app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
-app.config["JWT_SECRET_KEY"] = os.environ.get("JWT_SECRET")
-app.config["JWT_ACCESS_TOKEN_EXPIRES"] = timedelta(hours=24)
-
-# Initialize extensions
-bcrypt = Bcrypt(app)
-jwt = JWTManager(app)
-migrate = Migrate(app, db)
-db.init_app(app)
-CORS(app)
-api = Api(app)
+from config import Config, engine_options
+from models import db
+
+# Extensions, bound to an app by create_app()
+bcrypt = Bcrypt()
+jwt = JWTManager()
+migrate = Migrate()
+
 
 # JWT Error Handlers
 @jwt.unauthorized_loader
@@ -57,36 +30,57 @@ def invalid_token_callback(reason):
 def expired_token_callback(jwt_header, jwt_payload):
     return {"message": "Token expired"}, 401
 
-# ============================
-#        ROUTES
-# ============================
 
-# Auth Route
-api.add_resource(AuthResource, '/auth/<string:action>')
+def create_app(config=None):
+    """Build the Flask app from Config, with `config` overriding any setting"""
+    app = Flask(__name__)
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+    # Explicit SQLALCHEMY_ENGINE_OPTIONS win over the DB_* settings
+    app.config.setdefault("SQLALCHEMY_ENGINE_OPTIONS", engine_options(app.config))
+
+    # Initialize extensions
+    bcrypt.init_app(app)
+    jwt.init_app(app)
+    db.init_app(app)
+    migrate.init_app(app, db)
+    CORS(app)
+
+    from cache import init_caches
+    from mpesa_jobs import stk_push_queue
+    from commands import register_commands
+    from routes import register_routes
+    # Session hooks that keep the analytics counters, sales rollups and
+    # search index current; registered before the first flush, whatever
+    # resource runs it
+    import analytics  # noqa: F401
+    import rollups  # noqa: F401
+    import search  # noqa: F401
+
+    init_caches(app)
+    stk_push_queue.init_app(app)
+    register_commands(app)
+    register_routes(app, lazy=app.config["LAZY_RESOURCES"])
+    return app
+
 
-api.add_resource(CartResource, "/api/cart")
-api.add_resource(CartItemResource, "/api/cart/<int:item_id>")
-api.add_resource(ProductListResource, "/api/products")
-api.add_resource(OrderListResource, "/api/orders")
-api.add_resource(OrderResource, "/api/orders/<int:order_id>")
-api.add_resource(TransactionResource, "/api/transactions")
-api.add_resource(TransactionDetailResource, "/api/transactions/<int:transaction_id>")
-api.add_resource(TransactionCallbackResource, "/api/transactions/callback")
-api.add_resource(MpesaSTKPushResource, "/api/mpesa/stkpush")
+_app = None
 
-# Analytics Routes
-api.add_resource(UserAnalyticsResource, "/analytics/users")
-api.add_resource(TicketStatusAnalyticsResource, "/analytics/tickets/status")
-api.add_resource(ProductStatusAnalyticsResource, "/analytics/products/status")
 
-# Admin Routes
-api.add_resource(AdminDashboardResource, "/admin/dashboard")
-api.add_resource(AdminUserResource, "/admin/users", "/admin/users/<int:user_id>")
-api.add_resource(AdminProductResource, "/admin/products", "/admin/products/<int:product_id>")
-api.add_resource(AdminOrderResource, "/admin/orders", "/admin/orders/<int:order_id>")
-api.add_resource(AdminTicketResource, "/admin/tickets", "/admin/tickets/<int:ticket_id>")
+def __getattr__(name):
+    # `app` is built on first access, so `gunicorn app:app`, `flask run` and
+    # `from app import app` keep working without paying for it on import
+    global _app
+    if name == "app":
+        if _app is None:
+            _app = create_app()
+        return _app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 # ==== Entry Point ====
+# Development server only; debug mode comes from FLASK_DEBUG=1.
+# Production runs gunicorn with gunicorn.conf.py
 if __name__ == "__main__":
-    app.run(host='0.0.0.0', port=5555, debug=True)
+    create_app().run(host='0.0.0.0', port=5555)
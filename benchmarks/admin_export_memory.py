@@ -0,0 +1,96 @@
+"""
+Peak memory of the admin order list: JSON list vs streamed export.
+
+Seeds a file-backed SQLite database with orders of two items each and
+reads GET /admin/orders?all=true as one JSON document and as
+?format=ndjson and ?format=csv streams, recording the Python heap peak (tracemalloc) for
+each. The streamed exports should stay roughly flat as the table grows;
+exits non-zero if the largest export peaks at more than twice the
+smallest. Sizes should be well above export.BATCH_SIZE (1000 rows), below
+which a stream holds its whole table anyway.
+
+    python benchmarks/admin_export_memory.py [sizes...]
+"""
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_PATH = os.path.join(tempfile.mkdtemp(), "export.db")
+os.environ["DATABASE_URI"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("JWT_SECRET", "benchmark-secret-key-with-enough-bytes")
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from decorators import role_claims
+from models import db, User, Product, Order, OrderItem
+
+SIZES = (2000, 10000, 25000)
+
+
+def seed(count):
+    db.drop_all()
+    db.create_all()
+    admin = User(first_name="Admin", last_name="User", email="admin@example.com",
+                 password_hash="x", role="admin", is_approved=True)
+    product = Product(name="Panel", price=100, stock=10)
+    db.session.add_all([admin, product])
+    db.session.commit()
+
+    now = datetime.now()
+    db.session.execute(Order.__table__.insert(), [
+        {"id": i, "status": "paid", "created_at": now, "updated_at": now, "customer_id": admin.id}
+        for i in range(1, count + 1)
+    ])
+    db.session.execute(OrderItem.__table__.insert(), [
+        {"order_id": i, "product_id": product.id, "quantity": q, "unit_price": 100, "total_price": 100 * q}
+        for i in range(1, count + 1) for q in (1, 2)
+    ])
+    db.session.commit()
+    return create_access_token(identity=admin.id, additional_claims=role_claims(admin))
+
+
+def measure(client, url, headers):
+    db.session.remove()
+    tracemalloc.start()
+    start = time.perf_counter()
+    response = client.get(url, headers=headers, buffered=False)
+    size = sum(len(chunk) for chunk in response.response)
+    response.close()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    assert response.status_code == 200, response.status_code
+    return peak / 2**20, size / 2**20, elapsed
+
+
+def main():
+    sizes = [int(arg) for arg in sys.argv[1:]] or SIZES
+    client = app.test_client()
+    peaks = {}
+    print(f"{'orders':>7}  {'mode':6} {'peak MiB':>9} {'body MiB':>9} {'seconds':>8}")
+    for count in sizes:
+        with app.app_context():
+            token = seed(count)
+        headers = {"Authorization": f"Bearer {token}"}
+        for mode, url in (("json", "/admin/orders?all=true"),
+                          ("ndjson", "/admin/orders?format=ndjson"),
+                          ("csv", "/admin/orders?format=csv")):
+            with app.app_context():
+                peak, size, elapsed = measure(client, url, headers)
+            peaks[(mode, count)] = peak
+            print(f"{count:>7}  {mode:6} {peak:9.1f} {size:9.1f} {elapsed:8.2f}")
+
+    smallest, largest = min(sizes), max(sizes)
+    for mode in ("ndjson", "csv"):
+        if peaks[(mode, largest)] > 2 * peaks[(mode, smallest)]:
+            print(f"FAIL: {mode} export memory grows with the table")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,78 @@
+"""
+Load test for M-Pesa callback ingestion under duplicate deliveries.
+
+Creates pending transactions in a file-backed SQLite database, then replays
+every transaction's callback many times from concurrent threads, the way
+Safaricom retries. Checks that each transaction was moved to a terminal state
+exactly once and reports throughput.
+
+    python benchmarks/callback_replay.py [transactions] [replays] [threads]
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_PATH = os.path.join(tempfile.mkdtemp(), "callbacks.db")
+os.environ["DATABASE_URI"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("JWT_SECRET", "benchmark-secret-key-with-enough-bytes")
+
+from app import app
+from models import db, Transaction
+
+
+def callback(checkout_request_id, result_code):
+    return {"Body": {"stkCallback": {
+        "MerchantRequestID": "bench",
+        "CheckoutRequestID": checkout_request_id,
+        "ResultCode": result_code,
+        "ResultDesc": "The service request is processed successfully." if result_code == 0 else "Request cancelled by user",
+    }}}
+
+
+def main():
+    transactions = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    replays = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+
+    with app.app_context():
+        db.create_all()
+        db.session.add_all([
+            Transaction(phone="254700000000", amount=10, status="pending", checkout_request_id=f"ws_CO_{i}")
+            for i in range(transactions)
+        ])
+        db.session.commit()
+
+    # Interleave so duplicates of the same callback race each other
+    payloads = [callback(f"ws_CO_{i}", 0 if i % 3 else 1032) for _ in range(replays) for i in range(transactions)]
+
+    def deliver(payload):
+        client = app.test_client()
+        response = client.post("/api/transactions/callback", json=payload)
+        return response.status_code, response.get_json()["message"]
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = Counter(pool.map(deliver, payloads))
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        statuses = Counter(status for (status,) in db.session.query(Transaction.status))
+
+    applied = results[(200, "Transaction updated successfully")]
+    print(f"{len(payloads)} callbacks ({transactions} transactions x {replays} replays, {threads} threads) "
+          f"in {elapsed:.2f}s -> {len(payloads) / elapsed:.0f}/s")
+    for (code, message), n in sorted(results.items()):
+        print(f"  {code} {message}: {n}")
+    print(f"  final statuses: {dict(statuses)}")
+
+    ok = applied == transactions and statuses.get("pending", 0) == 0
+    print("OK: every callback applied exactly once" if ok else "FAIL: callbacks applied more or less than once")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Round-trip count for checkout (POST /api/orders).
+
+Seeds an in-memory SQLite database, fills a user's cart with 1, 10 and 100
+items and counts the SQL statements checkout sends for each. Inserting the
+order items and clearing the cart are batched, so the count should stay flat
+as the cart grows; exits non-zero if it does not.
+
+    python benchmarks/checkout_round_trips.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URI"] = "sqlite://"
+os.environ.setdefault("JWT_SECRET", "benchmark-secret-key-with-enough-bytes")
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import app
+from models import db, User, Category, Product, CartItem
+
+CART_SIZES = (1, 10, 100)
+
+
+def seed(cart_size):
+    db.drop_all()
+    db.create_all()
+    customer = User(first_name="Jane", last_name="Customer", email="jane@example.com",
+                    password_hash="x", phone="254700000000", role="customer", is_approved=True)
+    category = Category(name="Panels")
+    products = [Product(name=f"Product {i}", price=100 + i, stock=1000, category=category)
+                for i in range(cart_size)]
+    db.session.add_all([customer, category, *products])
+    db.session.flush()
+    db.session.add_all([
+        CartItem(user_id=customer.id, product_id=product.id, quantity=2, price=product.price, name=product.name)
+        for product in products
+    ])
+    db.session.commit()
+    return create_access_token(identity=customer.id)
+
+
+def checkout(client, token):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    start = time.perf_counter()
+    try:
+        response = client.post("/api/orders", headers={"Authorization": f"Bearer {token}"})
+    finally:
+        elapsed = time.perf_counter() - start
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert response.status_code == 201, response.get_json()
+    return statements, elapsed
+
+
+def main():
+    client = app.test_client()
+    counts = []
+    with app.app_context():
+        for size in CART_SIZES:
+            token = seed(size)
+            statements, elapsed = checkout(client, token)
+            assert CartItem.query.count() == 0
+            counts.append(len(statements))
+            print(f"cart of {size:3} items: {len(statements):3} statements  {elapsed * 1000:7.1f} ms")
+            if "-v" in sys.argv:
+                for statement in statements:
+                    print("    " + " ".join(statement.split())[:100])
+
+    constant = len(set(counts)) == 1
+    if not constant:
+        print("statement count grows with cart size")
+    sys.exit(0 if constant else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Concurrent checkout stress test for stock reservation.
+
+Gives many customers a cart with the same scarce product (plus one with
+plenty of stock) in a file-backed SQLite database, then checks out every
+cart at once from concurrent threads. Checks that exactly the available
+stock was sold, that stock never went negative, that every successful
+checkout produced an order and that every other one got a 409 and left
+nothing behind.
+
+    python benchmarks/checkout_stock_contention.py [customers] [stock] [threads]
+
+Point DATABASE_URI at a scratch Postgres database to run it there instead.
+"""
+import os
+import sys
+import tempfile
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_PATH = os.path.join(tempfile.mkdtemp(), "checkout.db")
+os.environ.setdefault("DATABASE_URI", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("JWT_SECRET", "benchmark-secret-key-with-enough-bytes")
+
+from flask_jwt_extended import create_access_token
+
+from app import app
+from models import db, User, Product, CartItem, Order, OrderItem
+
+
+def main():
+    customers = int(sys.argv[1]) if len(sys.argv) > 1 else 200
+    stock = int(sys.argv[2]) if len(sys.argv) > 2 else 50
+    threads = int(sys.argv[3]) if len(sys.argv) > 3 else 16
+
+    with app.app_context():
+        db.drop_all()
+        db.create_all()
+        scarce = Product(name="Flash sale panel", price=100, stock=stock)
+        plenty = Product(name="Cable", price=5, stock=customers * 10)
+        users = [User(first_name="Customer", last_name=str(i), email=f"customer{i}@example.com",
+                      password_hash="x", phone="254700000000") for i in range(customers)]
+        db.session.add_all([scarce, plenty, *users])
+        db.session.flush()
+        for user in users:
+            db.session.add(CartItem(user_id=user.id, product_id=plenty.id, quantity=2, price=plenty.price))
+            db.session.add(CartItem(user_id=user.id, product_id=scarce.id, quantity=1, price=scarce.price))
+        db.session.commit()
+        tokens = [create_access_token(identity=user.id) for user in users]
+        scarce_id, plenty_id = scarce.id, plenty.id
+
+    def checkout(token):
+        client = app.test_client()
+        response = client.post("/api/orders", headers={"Authorization": f"Bearer {token}"})
+        return response.status_code
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        results = Counter(pool.map(checkout, tokens))
+    elapsed = time.perf_counter() - start
+
+    with app.app_context():
+        scarce_left = db.session.get(Product, scarce_id).stock
+        plenty_left = db.session.get(Product, plenty_id).stock
+        orders = Order.query.count()
+        scarce_sold = db.session.query(db.func.coalesce(db.func.sum(OrderItem.quantity), 0)) \
+            .filter(OrderItem.product_id == scarce_id).scalar()
+        carts_left = CartItem.query.count()
+
+    print(f"{customers} concurrent checkouts for {stock} units ({threads} threads) in {elapsed:.2f}s "
+          f"-> {customers / elapsed:.0f}/s")
+    for code, n in sorted(results.items()):
+        print(f"  {code}: {n}")
+    print(f"  orders: {orders}, units sold: {scarce_sold}, stock left: {scarce_left}, "
+          f"other product left: {plenty_left}, carts left: {carts_left}")
+
+    ok = (
+        results[201] == orders == scarce_sold == stock - scarce_left
+        and scarce_left >= 0
+        and plenty_left == customers * 10 - 2 * orders
+        and carts_left == 2 * (customers - orders)
+        and (scarce_left == 0 or results[409] == 0)
+    )
+    print("OK: no overselling, failed checkouts left no trace" if ok else "FAIL: stock and orders disagree")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
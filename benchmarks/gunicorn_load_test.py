@@ -0,0 +1,188 @@
+"""
+Load test for the gunicorn worker classes.
+
+Starts a fake Daraja API that answers every call after a fixed delay,
+seeds a file-backed SQLite database, then boots gunicorn with
+gunicorn.conf.py once per worker class and drives a mix of STK pushes
+(slow, blocked on Daraja) and product listings (fast) from concurrent
+clients. Reports throughput and latency percentiles per endpoint, so the
+effect of slow Daraja responses on the rest of the API is visible.
+
+    python benchmarks/gunicorn_load_test.py [seconds] [clients] [daraja_delay] [worker classes...]
+
+Needs gunicorn installed (and gevent for the gevent run). Worker count
+and threads come from the usual GUNICORN_* variables.
+"""
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DB_PATH = os.path.join(tempfile.mkdtemp(), "load.db")
+os.environ["DATABASE_URI"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("JWT_SECRET", "benchmark-secret-key-with-enough-bytes")
+
+import requests
+from flask_jwt_extended import create_access_token
+
+from app import create_app
+from models import db, User, Category, Product
+
+STK_SHARE = 0.2
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def fake_daraja(delay):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, body):
+            time.sleep(delay)
+            data = json.dumps(body).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def do_GET(self):
+            self._reply({"access_token": "load-test-token", "expires_in": "3599"})
+
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            self._reply({
+                "MerchantRequestID": "load-test",
+                "CheckoutRequestID": f"ws_CO_{random.getrandbits(64)}",
+                "ResponseCode": "0",
+            })
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", free_port()), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return f"http://127.0.0.1:{server.server_address[1]}"
+
+
+def seed():
+    app = create_app()
+    with app.app_context():
+        db.create_all()
+        user = User(first_name="Load", last_name="Test", email="load@example.com",
+                    password_hash="x", phone="254700000000")
+        category = Category(name="Panels")
+        db.session.add_all([user, category])
+        db.session.add_all([Product(name=f"Product {i}", price=100 + i, stock=100, category=category)
+                            for i in range(200)])
+        db.session.commit()
+        return create_access_token(identity=user.id)
+
+
+def start_gunicorn(worker_class, daraja_url):
+    port = free_port()
+    env = {
+        **os.environ,
+        "GUNICORN_WORKER_CLASS": worker_class,
+        "GUNICORN_BIND": f"127.0.0.1:{port}",
+        "GUNICORN_ACCESS_LOG": "",
+        "GUNICORN_LOG_LEVEL": "warning",
+        "MPESA_BASE_URL": daraja_url,
+        "MPESA_CONSUMER_KEY": "key",
+        "MPESA_CONSUMER_SECRET": "secret",
+        "MPESA_SHORTCODE": "174379",
+        "MPESA_PASSKEY": "passkey",
+        "BASE_URL": "http://127.0.0.1",
+    }
+    process = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "app:app"], cwd=ROOT, env=env
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            requests.get(f"{url}/api/products?limit=1", timeout=1)
+            return process, url
+        except requests.RequestException:
+            time.sleep(0.2)
+    process.kill()
+    raise RuntimeError(f"gunicorn ({worker_class}) did not start")
+
+
+def drive(url, token, seconds, clients):
+    latencies = defaultdict(list)
+    errors = defaultdict(int)
+    lock = threading.Lock()
+    deadline = time.monotonic() + seconds
+
+    def client():
+        session = requests.Session()
+        session.headers["Authorization"] = f"Bearer {token}"
+        while time.monotonic() < deadline:
+            if random.random() < STK_SHARE:
+                name, call = "stk push", lambda: session.post(
+                    f"{url}/api/mpesa/stkpush", json={"phone": "254700000000", "amount": 10}, timeout=60)
+            else:
+                name, call = "products", lambda: session.get(f"{url}/api/products?limit=20", timeout=60)
+            start = time.perf_counter()
+            try:
+                ok = call().status_code < 400
+            except requests.RequestException:
+                ok = False
+            elapsed = time.perf_counter() - start
+            with lock:
+                if ok:
+                    latencies[name].append(elapsed)
+                else:
+                    errors[name] += 1
+
+    threads = [threading.Thread(target=client) for _ in range(clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return latencies, errors
+
+
+def percentile(values, p):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * p))] if values else float("nan")
+
+
+def main():
+    seconds = float(sys.argv[1]) if len(sys.argv) > 1 else 20
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    delay = float(sys.argv[3]) if len(sys.argv) > 3 else 1.0
+    worker_classes = sys.argv[4:] or ["sync", "gthread", "gevent"]
+
+    daraja_url = fake_daraja(delay)
+    token = seed()
+    print(f"{clients} clients for {seconds:.0f}s, {STK_SHARE:.0%} STK pushes, Daraja answers after {delay}s")
+    print(f"{'worker class':12} {'endpoint':9} {'req/s':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>6}")
+    for worker_class in worker_classes:
+        process, url = start_gunicorn(worker_class, daraja_url)
+        try:
+            latencies, errors = drive(url, token, seconds, clients)
+        finally:
+            process.terminate()
+            process.wait()
+        for name in ("products", "stk push"):
+            values = latencies[name]
+            print(f"{worker_class:12} {name:9} {len(values) / seconds:7.1f} "
+                  f"{percentile(values, 0.5) * 1000:8.0f} {percentile(values, 0.95) * 1000:8.0f} "
+                  f"{percentile(values, 0.99) * 1000:8.0f} {errors[name]:6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""
+Query-count regression check for the product listing endpoints.
+
+Seeds an in-memory SQLite database with products that each have a provider,
+a category and tags, then counts the SQL statements issued by the listing
+endpoints at several catalog sizes. Exits non-zero if the count grows with
+the number of products (an N+1 lazy load crept back in).
+
+    python benchmarks/product_listing_queries.py
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URI"] = "sqlite://"
+os.environ.setdefault("JWT_SECRET", "benchmark-secret-key-with-enough-bytes")
+
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import app
+from decorators import role_claims
+from models import db, User, Category, Product, Tag
+
+SIZES = (10, 100, 500)
+
+
+def seed(count):
+    db.drop_all()
+    db.create_all()
+    admin = User(first_name="Admin", last_name="User", email="admin@example.com",
+                 password_hash="x", role="admin", is_approved=True)
+    categories = [Category(name=f"Category {i}") for i in range(5)]
+    tags = [Tag(name=f"tag-{i}") for i in range(8)]
+    db.session.add_all([admin, *categories, *tags])
+    db.session.flush()
+    for i in range(count):
+        provider = User(first_name="Provider", last_name=str(i), email=f"provider{i}@example.com",
+                        password_hash="x", role="provider", is_approved=True)
+        db.session.add(Product(name=f"Product {i}", price=10 + i, provider=provider,
+                               category=categories[i % 5], tags=[tags[i % 8], tags[(i + 3) % 8]]))
+    db.session.commit()
+    return create_access_token(identity=admin.id, additional_claims=role_claims(admin))
+
+
+def count_queries(client, url, headers):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        response = client.get(url, headers=headers)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert response.status_code == 200, response.get_json()
+    return len(statements)
+
+
+def main():
+    client = app.test_client()
+    endpoints = {
+        "/api/products?all=true": {},
+        "/api/products?limit=100": {},
+        "/admin/products?all=true": None,
+        "/admin/products?limit=100": None,
+    }
+    results = {url: [] for url in endpoints}
+    with app.app_context():
+        for size in SIZES:
+            token = seed(size)
+            auth = {"Authorization": f"Bearer {token}"}
+            # The admin's role is read from the database once and then
+            # cached per worker (decorators.current_role), not per listing
+            client.get("/admin/metrics", headers=auth)
+            for url, headers in endpoints.items():
+                results[url].append(count_queries(client, url, auth if headers is None else headers))
+
+    failed = False
+    for url, counts in results.items():
+        constant = len(set(counts)) == 1
+        failed = failed or not constant
+        print(f"{url:28} " + "  ".join(f"{size}: {n}" for size, n in zip(SIZES, counts))
+              + ("" if constant else "  <-- grows with catalog size"))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
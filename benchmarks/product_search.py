@@ -0,0 +1,120 @@
+"""
+Product search on a large synthetic catalog: index vs substring scan.
+
+Seeds a file-backed SQLite database with 100k products (names, short and
+long descriptions and two tags each built from a small vocabulary),
+times `flask rebuild-search-index` and then compares the FTS5 search
+behind /api/products/search with a LIKE '%word%' scan of the text
+columns for every match, which ranking without an index has to collect
+(tags are left out of the scan, which only flatters it). Also checks that an ORM
+update is searchable straight away. Exits non-zero if a search is
+slower than the scan it replaces.
+
+    python benchmarks/product_search.py [products]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_PATH = os.path.join(tempfile.mkdtemp(), "search.db")
+os.environ["DATABASE_URI"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("JWT_SECRET", "benchmark-secret-key-with-enough-bytes")
+
+from sqlalchemy import and_, or_, select
+
+from app import app
+from models import db, Product, Tag, product_tags
+from search import rebuild_search_index, search_product_ids
+
+KINDS = ["panel", "inverter", "battery", "lantern", "controller", "cable", "pump", "fridge", "kit", "bulb"]
+TRAITS = ["solar", "portable", "monocrystalline", "lithium", "waterproof", "hybrid", "smart", "compact"]
+USES = ["home", "farm", "shop", "school", "clinic", "camping", "irrigation", "lighting"]
+TAGS = ["outdoor", "indoor", "off-grid", "backup", "premium", "budget", "bestseller", "new", "eco", "heavy-duty"]
+
+QUERIES = ["solar", "inverter", "lith batt", "waterproof pump irrigation", "monocrys", "off grid", "zzz"]
+REPEATS = 20
+SCAN_REPEATS = 3
+
+
+def seed(count):
+    db.drop_all()
+    db.create_all()
+    rng = random.Random(42)
+    tags = [Tag(name=name) for name in TAGS]
+    db.session.add_all(tags)
+    db.session.flush()
+
+    rows = []
+    for i in range(1, count + 1):
+        kind, trait, use = rng.choice(KINDS), rng.choice(TRAITS), rng.choice(USES)
+        rows.append({
+            "id": i,
+            "name": f"{trait.title()} {kind} {rng.randint(10, 500)}W",
+            "short_description": f"{trait} {kind} for {use}",
+            "description": f"A {rng.choice(TRAITS)} {kind} built for {use} use. " * 3,
+            "price": rng.randint(500, 90000),
+        })
+    db.session.execute(Product.__table__.insert(), rows)
+    db.session.execute(product_tags.insert(), [
+        {"product_id": i, "tag_id": tag.id}
+        for i in range(1, count + 1) for tag in rng.sample(tags, 2)
+    ])
+    db.session.commit()
+
+
+def like_scan(query):
+    words = query.lower().split()
+    columns = (Product.name, Product.short_description, Product.description)
+    match = and_(*[or_(*[column.ilike(f"%{word}%") for column in columns]) for word in words])
+    return db.session.execute(select(Product.id).where(match)).scalars().all()
+
+
+def timed(fn, *args, repeats=REPEATS):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = fn(*args)
+        times.append(time.perf_counter() - start)
+    times.sort()
+    return result, times[len(times) // 2] * 1000
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 100_000
+    failures = 0
+    with app.app_context():
+        start = time.perf_counter()
+        seed(count)
+        print(f"seeded {count} products in {time.perf_counter() - start:.1f}s")
+        start = time.perf_counter()
+        indexed = rebuild_search_index()
+        print(f"rebuild-search-index: {indexed} products in {time.perf_counter() - start:.1f}s\n")
+
+        print(f"{'query':30} {'scan hits':>9} {'index ms':>9} {'LIKE ms':>9}")
+        for query in QUERIES:
+            _, index_ms = timed(search_product_ids, query, 20)
+            matches, scan_ms = timed(like_scan, query, repeats=SCAN_REPEATS)
+            slower = index_ms > scan_ms
+            failures += slower
+            print(f"{query:30} {len(matches):>9} {index_ms:9.2f} {scan_ms:9.2f}{'  SLOWER' if slower else ''}")
+
+        client = app.test_client()
+        _, request_ms = timed(lambda: client.get("/api/products/search?q=solar+panel&limit=20").get_json())
+        print(f"\nGET /api/products/search?q=solar+panel: {request_ms:.2f} ms (p50, cached after the first)")
+
+        product = db.session.get(Product, 1)
+        product.name = "Quasar floodlight"
+        db.session.commit()
+        synced = search_product_ids("quasar flood", 20) == [1]
+        print(f"ORM update searchable immediately: {synced}")
+        failures += not synced
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
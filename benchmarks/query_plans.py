@@ -0,0 +1,186 @@
+"""
+Query-plan regression check for the per-user lookups and admin filters.
+
+Builds the schema by running every migration against a scratch SQLite
+database and seeds a customer, some orders and the admin list data. It
+then calls the customer endpoints (cart, checkout, order history and its
+next page, order detail, transactions) and the filtered admin list pages
+through the test client, capturing every statement they send with
+before_cursor_execute. Each captured SELECT, UPDATE and DELETE is run
+through EXPLAIN with its own parameters. The check exits non-zero if
+any of them scans a whole table instead of searching an index, or if a
+paginated list needs a separate sort step (sorting ties on the last key
+within index order is fine).
+
+    python benchmarks/query_plans.py
+
+Point DATABASE_URI at an already migrated, empty Postgres database to check
+its plans instead. The check seeds it, and sequential scans are disabled
+for it, so a scan in the plan means no usable index exists.
+"""
+import json
+import os
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+DB_PATH = os.path.join(tempfile.mkdtemp(), "plans.db")
+os.environ.setdefault("DATABASE_URI", f"sqlite:///{DB_PATH}")
+os.environ.setdefault("JWT_SECRET", "benchmark-secret-key-with-enough-bytes")
+
+from flask_jwt_extended import create_access_token
+from flask_migrate import upgrade
+from sqlalchemy import event, text
+
+from app import app
+from decorators import role_claims
+from models import db, User, Category, Product, Order, OrderItem, SupportTicket, Transaction
+
+ORDERS = 6
+PAGE = 2
+
+
+def seed():
+    """Customer and admin auth headers, plus ids the endpoints below need"""
+    admin = User(first_name="Admin", last_name="User", email="admin@example.com",
+                 password_hash="x", role="admin", is_approved=True)
+    customer = User(first_name="Jane", last_name="Customer", email="jane@example.com",
+                    password_hash="x", phone="254700000000")
+    doomed = User(first_name="Jade", last_name="Leaving", email="jade@example.com",
+                  password_hash="x", phone="254700000001")
+    providers = [User(first_name="Provider", last_name=str(i), email=f"janet{i}@example.com",
+                      password_hash="x", role="provider", is_approved=i % 2 == 0) for i in range(6)]
+    category = Category(name="Panels")
+    products = [Product(name=f"Panel {i}", price=100 + i, stock=100, category=category) for i in range(3)]
+    db.session.add_all([admin, customer, doomed, category, *providers, *products])
+    db.session.flush()
+    for i in range(ORDERS):
+        db.session.add(Order(customer_id=customer.id, status="pending" if i % 2 else "paid", items=[
+            OrderItem(product_id=products[0].id, quantity=1, unit_price=100, total_price=100)]))
+    for user in (customer, doomed):
+        db.session.add_all([
+            Transaction(user_id=user.id, phone=user.phone, amount=100, status="pending"),
+            SupportTicket(user_id=user.id, subject="Inverter", message="Beeps", status="open"),
+            SupportTicket(user_id=user.id, subject="Panel", message="Cracked", status="open"),
+            SupportTicket(user_id=user.id, subject="Battery", message="Flat", status="open"),
+        ])
+    db.session.commit()
+
+    def auth(user):
+        token = create_access_token(identity=user.id, additional_claims=role_claims(user))
+        return {"Authorization": f"Bearer {token}"}
+
+    return {"customer": auth(customer), "admin": auth(admin), "customer_id": customer.id,
+            "doomed_id": doomed.id, "product_id": products[0].id,
+            "order_id": db.session.query(Order.id).filter_by(customer_id=customer.id).first()[0]}
+
+
+def endpoints(ids):
+    """(name, role, method, url, json body, must ORDER BY come from an index, follow next_cursor)"""
+    customer_id, limit = ids["customer_id"], f"limit={PAGE}"
+    return [
+        ("add to cart", "customer", "POST", "/api/cart", {"product_id": ids["product_id"]}, False, False),
+        ("add to cart again", "customer", "POST", "/api/cart", {"product_id": ids["product_id"]}, False, False),
+        ("cart", "customer", "GET", "/api/cart", None, False, False),
+        ("checkout", "customer", "POST", "/api/orders", None, False, False),
+        ("order history", "customer", "GET", f"/api/orders?{limit}", None, True, True),
+        ("order history summary", "customer", "GET", f"/api/orders?summary=true&{limit}", None, True, True),
+        ("order detail", "customer", "GET", f"/api/orders/{ids['order_id']}", None, False, False),
+        ("transactions", "customer", "GET", "/api/transactions", None, False, False),
+        ("admin users by role", "admin", "GET", f"/admin/users?role=provider&{limit}", None, True, True),
+        ("admin users by approval", "admin", "GET", f"/admin/users?is_approved=false&{limit}", None, True, True),
+        ("admin users by email prefix", "admin", "GET", f"/admin/users?q=janet&{limit}", None, False, False),
+        ("admin orders by status", "admin", "GET", f"/admin/orders?status=pending&{limit}", None, True, True),
+        ("admin orders by customer", "admin", "GET", f"/admin/orders?customer_id={customer_id}&{limit}",
+         None, True, True),
+        ("admin tickets by status", "admin", "GET", f"/admin/tickets?status=open&{limit}", None, True, True),
+        # The ORM loads the user's orders, transactions and tickets to cascade
+        ("admin delete user", "admin", "DELETE", f"/admin/users/{ids['doomed_id']}", None, False, False),
+    ]
+
+
+def capture(client, method, url, headers, body):
+    """The response and the (statement, parameters) the request sent"""
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if not executemany and statement.lstrip().split(None, 1)[0].upper() in ("SELECT", "UPDATE", "DELETE", "WITH"):
+            statements.append((statement, parameters))
+
+    event.listen(db.engine, "before_cursor_execute", record)
+    try:
+        response = client.open(url, method=method, headers=headers, json=body)
+    finally:
+        event.remove(db.engine, "before_cursor_execute", record)
+    assert response.status_code < 300, (url, response.status_code, response.get_json())
+    return response, statements
+
+
+def endpoint_statements(client, ids):
+    """(name, statement, parameters, ordered) for every statement the endpoints send"""
+    for name, role, method, url, body, ordered, follow in endpoints(ids):
+        response, statements = capture(client, method, url, ids[role], body)
+        captured = [(name, statement, parameters, ordered) for statement, parameters in statements]
+        if follow:
+            cursor = response.get_json()["next_cursor"]
+            assert cursor, f"{url} has a single page; seed more rows"
+            _, statements = capture(client, method, f"{url}&cursor={cursor}", ids[role], body)
+            captured += [(f"{name} next page", statement, parameters, ordered) for statement, parameters in statements]
+        yield from captured
+
+
+def sqlite_problems(connection, sql, parameters, ordered):
+    plan = [row[3] for row in connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}", parameters)]
+    problems = [line for line in plan if line.startswith("SCAN ")]
+    if ordered:
+        problems += [line for line in plan if "TEMP B-TREE FOR ORDER BY" in line]
+    return plan, problems
+
+
+def postgres_problems(connection, sql, parameters, ordered):
+    connection.execute(text("SET LOCAL enable_seqscan = off"))
+    plan = connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}", parameters).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    nodes, pending = [], [plan[0]["Plan"]]
+    while pending:
+        node = pending.pop()
+        nodes.append(node)
+        pending.extend(node.get("Plans", []))
+    lines = [f"{node['Node Type']} {node.get('Relation Name', '')}".strip() for node in nodes]
+    problems = [line for line in lines if line.startswith("Seq Scan")]
+    if ordered:
+        problems += [line for line in lines if line.startswith("Sort")]
+    return lines, problems
+
+
+def main():
+    with app.app_context():
+        dialect = db.engine.dialect.name
+        if dialect == "sqlite":
+            upgrade(directory=os.path.join(ROOT, "migrations"))
+        explain = {"sqlite": sqlite_problems, "postgresql": postgres_problems}.get(dialect)
+        if explain is None:
+            sys.exit(f"No plan check for the {dialect} dialect")
+
+        ids = seed()
+        captured = list(endpoint_statements(app.test_client(), ids))
+
+        failures = 0
+        with db.engine.connect() as connection:
+            for name, statement, parameters, ordered in captured:
+                # Rolled back, so EXPLAIN never changes what the next plan sees
+                with connection.begin() as transaction:
+                    plan, problems = explain(connection, statement, parameters, ordered)
+                    transaction.rollback()
+                failures += bool(problems)
+                summary = " ".join(statement.split())[:60]
+                print(f"{'FAIL' if problems else 'ok':4}  {name:34} {summary:60}  {' | '.join(plan)}")
+
+    if failures:
+        print(f"{failures} statements fall back to a full scan or sort")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
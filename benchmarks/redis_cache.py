@@ -0,0 +1,174 @@
+"""
+The shared Redis cache backend, run against a fakeredis stand-in.
+
+Builds the app with CACHE_URL=redis:// and a fakeredis client passed as
+CACHE_REDIS_CLIENT, seeds a file-backed SQLite database, and checks the
+caches that depend on Redis being shared. A second "worker" is simulated
+by pointing the caches at another client on the same fake server:
+
+- catalog listings are stored in Redis, served to the other worker, and
+  dropped for everyone by an admin product update
+- admin checks use the role claims without querying users, and a
+  demotion made in one worker is seen by the other one
+- a Daraja token fetched by one worker is adopted by the other, and
+  invalidate() removes it for both
+- a Redis outage turns into cache misses, not failed requests
+
+Exits non-zero if any check fails.
+
+    python benchmarks/redis_cache.py
+
+Needs fakeredis (pip install fakeredis).
+"""
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DB_PATH = os.path.join(tempfile.mkdtemp(), "redis_cache.db")
+os.environ["DATABASE_URI"] = f"sqlite:///{DB_PATH}"
+os.environ.setdefault("JWT_SECRET", "benchmark-secret-key-with-enough-bytes")
+
+try:
+    import fakeredis
+except ImportError:
+    sys.exit("benchmarks/redis_cache.py needs fakeredis: pip install fakeredis")
+from flask_jwt_extended import create_access_token
+from sqlalchemy import event
+
+from app import create_app
+from cache import catalog_cache, init_caches, mpesa_token_store, user_role_cache
+from decorators import role_claims
+from models import db, User, Category, Product
+from mpesa_auth import AccessTokenCache
+
+SERVER = fakeredis.FakeServer()
+PREFIX = "ray:"
+
+
+def worker(app):
+    """Point the caches at a new client on the shared fake server, as another process would"""
+    app.config["CACHE_REDIS_CLIENT"] = fakeredis.FakeRedis(server=SERVER)
+    init_caches(app)
+    return app.config["CACHE_REDIS_CLIENT"]
+
+
+def keys(client, namespace):
+    return client.keys(f"{PREFIX}{namespace}:*")
+
+
+def seed(app):
+    with app.app_context():
+        db.create_all()
+        admin = User(first_name="Ada", last_name="Admin", email="ada@example.com",
+                     password_hash="x", role="admin", is_approved=True)
+        other = User(first_name="Bo", last_name="Admin", email="bo@example.com",
+                     password_hash="x", role="admin", is_approved=True)
+        category = Category(name="Panels")
+        db.session.add_all([admin, other, category])
+        db.session.add_all([Product(name=f"Panel {i}", price=100 + i, stock=10, category=category)
+                            for i in range(10)])
+        db.session.commit()
+        return [
+            {"Authorization": f"Bearer {create_access_token(identity=user.id, additional_claims=role_claims(user))}"}
+            for user in (admin, other)
+        ] + [other.id]
+
+
+def check_catalog(app, client, headers):
+    first = worker(app)
+    client.get("/api/products?limit=5")
+    stored = len(keys(first, "catalog"))
+    worker(app)
+    body = client.get("/api/products?limit=5").get_json()
+    hits = catalog_cache.stats()["hits"]
+    client.patch(f"/admin/products/{body['items'][0]['id']}", json={"price": 999}, headers=headers)
+    cleared = len(keys(first, "catalog"))
+    price = client.get("/api/products?limit=5").get_json()["items"][0]["price"]
+    ok = stored >= 1 and hits == 1 and cleared == 0 and price == 999
+    return ok, f"{stored} keys stored, {hits} hit in the other worker, {cleared} left after the update, price {price}"
+
+
+def check_roles(app, client, headers, other_headers, other_id):
+    worker(app)
+    user_queries = []
+
+    def listener(conn, cursor, sql, *args):
+        if "FROM users" in sql:
+            user_queries.append(sql)
+
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", listener)
+        allowed = client.get("/admin/metrics", headers=other_headers).status_code
+        event.remove(db.engine, "before_cursor_execute", listener)
+    client.patch(f"/admin/users/{other_id}", json={"role": "customer"}, headers=headers)
+    redis = worker(app)
+    denied = client.get("/admin/metrics", headers=other_headers).status_code
+    ttl = max((redis.ttl(key) for key in keys(redis, "user-roles")), default=-1)
+    ok = allowed == 200 and not user_queries and denied == 403 and ttl > 23 * 3600
+    return ok, (f"claims: {allowed} with {len(user_queries)} user queries, "
+                f"after demotion in another worker: {denied}, override ttl {ttl}s")
+
+
+def check_token(app):
+    fetches = []
+
+    def fetch():
+        fetches.append(1)
+        return f"token-{len(fetches)}", 3599
+
+    worker(app)
+    first = AccessTokenCache(fetch=fetch, store=mpesa_token_store).get()
+    worker(app)
+    second_cache = AccessTokenCache(fetch=fetch, store=mpesa_token_store)
+    adopted = second_cache.get()
+    second_cache.invalidate(adopted)
+    refetched = AccessTokenCache(fetch=fetch, store=mpesa_token_store).get()
+    ok = first == adopted == "token-1" and refetched == "token-2" and len(fetches) == 2
+    return ok, f"worker 1 fetched {first}, worker 2 adopted {adopted}, after invalidate {refetched}"
+
+
+class BrokenRedis:
+    def __getattr__(self, name):
+        def fail(*args, **kwargs):
+            raise ConnectionError("Redis is down")
+        return fail
+
+
+def check_outage(app, client):
+    app.config["CACHE_REDIS_CLIENT"] = BrokenRedis()
+    init_caches(app)
+    status = client.get("/api/products?limit=5").status_code
+    stats = catalog_cache.stats()
+    ok = status == 200 and stats["backend"] == "redis" and stats["errors"] >= 1
+    return ok, f"status {status}, {stats['errors']} errors counted as misses"
+
+
+def main():
+    app = create_app({
+        "CACHE_URL": "redis://stand-in",
+        "CACHE_KEY_PREFIX": PREFIX,
+        "CACHE_REDIS_CLIENT": fakeredis.FakeRedis(server=SERVER),
+    })
+    headers, other_headers, other_id = seed(app)
+    client = app.test_client()
+    if not user_role_cache.shared:
+        sys.exit("CACHE_REDIS_CLIENT was not used")
+
+    results = [
+        ("catalog cache shared between workers", check_catalog(app, client, headers)),
+        ("role claims and overrides", check_roles(app, client, headers, other_headers, other_id)),
+        ("Daraja token shared between workers", check_token(app)),
+        ("Redis outage degrades to misses", check_outage(app, client)),
+    ]
+    failures = 0
+    for name, (ok, detail) in results:
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':4}  {name:38} {detail}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
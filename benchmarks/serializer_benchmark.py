@@ -0,0 +1,83 @@
+"""
+Compare SerializerMixin.to_dict() with the precompiled serializers.
+
+Loads 10k rows per model into an in-memory SQLite database (relationships
+eager-loaded, so only serialization is timed) and reports the best of three
+runs for each approach.
+
+    python benchmarks/serializer_benchmark.py [rows]
+"""
+import os
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URI"] = "sqlite://"
+os.environ.setdefault("JWT_SECRET", "benchmark-secret-key-with-enough-bytes")
+
+from sqlalchemy.orm import selectinload
+
+from app import app
+from models import db, User, Category, Tag, Product, Order, OrderItem, CartItem, Transaction, product_load_options
+import serializers
+
+
+def seed(rows):
+    db.create_all()
+    users = [User(first_name="User", last_name=str(i), email=f"user{i}@example.com", password_hash="x",
+                  phone="254700000000") for i in range(rows)]
+    categories = [Category(name=f"Category {i}") for i in range(10)]
+    tags = [Tag(name=f"tag-{i}") for i in range(10)]
+    db.session.add_all(users + categories + tags)
+    db.session.flush()
+
+    products = [Product(name=f"Product {i}", short_description="Short", description="Long description",
+                        price=100.0 + i, original_price=120.0 + i, stock=10, provider_id=users[i % 50].id,
+                        category_id=categories[i % 10].id, tags=[tags[i % 10], tags[(i + 1) % 10]])
+                for i in range(rows)]
+    db.session.add_all(products)
+    db.session.flush()
+
+    now = datetime.now()
+    for i in range(rows):
+        db.session.add(Order(customer_id=users[i].id, status="pending", created_at=now, items=[
+            OrderItem(product_id=products[i].id, quantity=2, unit_price=10.0, total_price=20.0)]))
+        db.session.add(CartItem(user_id=users[i].id, product_id=products[i].id, quantity=1, price=10.0, name="P"))
+        db.session.add(Transaction(user_id=users[i].id, phone="254700000000", amount=20.0, status="pending",
+                                   checkout_request_id=f"ws_CO_{i}", created_at=now))
+    db.session.commit()
+
+
+def best_of(fn, runs=3):
+    best = None
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def main():
+    rows = int(sys.argv[1]) if len(sys.argv) > 1 else 10_000
+    with app.app_context():
+        seed(rows)
+        cases = [
+            ("Product", Product.query.options(*product_load_options()).all(), serializers.product_to_dict),
+            ("Order", Order.query.options(selectinload(Order.items)).all(), serializers.order_to_dict),
+            ("OrderItem", OrderItem.query.all(), serializers.order_item_to_dict),
+            ("CartItem", CartItem.query.all(), serializers.cart_item_to_dict),
+            ("Transaction", Transaction.query.all(), serializers.transaction_to_dict),
+            ("User", User.query.all(), serializers.user_to_dict),
+        ]
+        print(f"{'model':12} {'rows':>6} {'to_dict()':>11} {'compiled':>10} {'speedup':>8}")
+        for name, objects, compiled in cases:
+            assert [o.to_dict() for o in objects[:100]] == [compiled(o) for o in objects[:100]]
+            slow = best_of(lambda: [o.to_dict() for o in objects])
+            fast = best_of(lambda: [compiled(o) for o in objects])
+            print(f"{name:12} {len(objects):>6} {slow * 1000:>9.1f}ms {fast * 1000:>8.1f}ms {slow / fast:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+"""
+Startup-time check for create_app().
+
+Builds the app in fresh interpreters under `python -X importtime`, with
+lazy resource registration on and off, and reports the wall time to a
+ready app, the total import time and the slowest imports. Pass a budget in
+milliseconds to exit non-zero when the lazy start-up exceeds it, e.g. in CI:
+
+    python benchmarks/startup_time.py [budget_ms]
+"""
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNS = 5
+TOP = 12
+
+CODE = """
+import time
+start = time.perf_counter()
+from app import create_app
+create_app()
+print(time.perf_counter() - start)
+import sys
+print(int('requests' in sys.modules))
+"""
+
+
+def start_app(lazy):
+    env = {
+        **os.environ,
+        "DATABASE_URI": "sqlite://",
+        "JWT_SECRET": "benchmark-secret-key-with-enough-bytes",
+        "LAZY_RESOURCES": "true" if lazy else "false",
+    }
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", CODE],
+        cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    )
+    seconds, requests_loaded = result.stdout.split()
+    imports = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|")
+        imports.append((int(self_us), int(cumulative_us), name.rstrip()))
+    return float(seconds), imports, requests_loaded == "1"
+
+
+def main():
+    budget_ms = float(sys.argv[1]) if len(sys.argv) > 1 else None
+    results = {}
+    for lazy in (True, False):
+        runs = [start_app(lazy) for _ in range(RUNS)]
+        best = min(runs, key=lambda run: run[0])
+        seconds, imports, requests_loaded = best
+        label = "lazy" if lazy else "eager"
+        results[label] = seconds
+        total_ms = sum(self_us for self_us, _, _ in imports) / 1000
+        print(f"{label:5}: create_app ready in {seconds * 1000:6.1f} ms (best of {RUNS}), "
+              f"{len(imports)} modules, {total_ms:6.1f} ms importing, "
+              f"requests {'imported' if requests_loaded else 'not imported'}")
+        top_level = [entry for entry in imports if not entry[2].startswith("  ")]
+        for _, cumulative_us, name in sorted(top_level, reverse=True, key=lambda e: e[1])[:TOP]:
+            print(f"         {cumulative_us / 1000:7.1f} ms  {name.strip()}")
+
+    if budget_ms is not None and results["lazy"] * 1000 > budget_ms:
+        print(f"lazy start-up {results['lazy'] * 1000:.1f} ms exceeds the {budget_ms:.0f} ms budget")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
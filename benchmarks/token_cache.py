@@ -0,0 +1,223 @@
+"""
+Daraja OAuth token cache against a local stub OAuth server.
+
+Starts a stub Daraja API that hands out numbered tokens (optionally slowly,
+with a chosen expires_in, or failing) and rejects STK pushes made with a
+revoked token, then checks AccessTokenCache end to end over HTTP:
+
+- concurrent get() calls on a cold cache make one upstream call
+- inside the refresh margin exactly one caller refreshes while the others
+  keep getting the old token
+- the token is reused until expires_in (less the margin) has passed
+- a refresh that fails inside the margin returns the still-valid token,
+  and fails once the token has expired
+- a 401 on the STK push invalidates the token and retries once
+
+Time inside the cache is driven by a fake clock, so no check waits for a
+token to expire. Exits non-zero if any check fails.
+
+    python benchmarks/token_cache.py
+"""
+import json
+import os
+import socket
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import mpesa_auth
+from mpesa_auth import AccessTokenCache, MpesaAuthError
+from mpesa_stk import send_stk_push
+
+THREADS = 16
+
+
+class StubDaraja:
+    """The OAuth and STK push endpoints, with knobs and call counts"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.delay = threading.Event()
+        self.release = threading.Event()
+        self.expires_in = "3599"
+        self.failing = False
+        self.issued = 0
+        self.revoked = set()
+        self.pushes = []
+
+    def oauth(self):
+        if self.delay.is_set():
+            self.release.wait(5)
+        with self.lock:
+            if self.failing:
+                return 400, {"errorCode": "400.008.01", "errorMessage": "Invalid Authentication passed"}
+            self.issued += 1
+            return 200, {"access_token": f"token-{self.issued}", "expires_in": self.expires_in}
+
+    def stk_push(self, authorization):
+        token = authorization[len("Bearer "):] if authorization.startswith("Bearer ") else authorization
+        with self.lock:
+            self.pushes.append(token)
+            if token in self.revoked:
+                return 401, {"errorCode": "404.001.03", "errorMessage": "Invalid Access Token"}
+        return 200, {"MerchantRequestID": "stub", "CheckoutRequestID": f"ws_CO_{len(self.pushes)}",
+                     "ResponseCode": "0"}
+
+    def serve(self):
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def _reply(self, status, body):
+                data = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_GET(self):
+                self._reply(*stub.oauth())
+
+            def do_POST(self):
+                self.rfile.read(int(self.headers.get("Content-Length", 0)))
+                self._reply(*stub.stk_push(self.headers.get("Authorization", "")))
+
+            def log_message(self, *args):
+                pass
+
+        with socket.socket() as s:
+            s.bind(("127.0.0.1", 0))
+            port = s.getsockname()[1]
+        server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+        server.daemon_threads = True
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{port}"
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def run_concurrently(fn, count=THREADS):
+    results = [None] * count
+    barrier = threading.Barrier(count)
+
+    def call(i):
+        barrier.wait()
+        results[i] = fn()
+
+    threads = [threading.Thread(target=call, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    return threads, results
+
+
+def check_cold_start(stub, clock):
+    cache = AccessTokenCache(refresh_margin=60, clock=clock)
+    stub.delay.set()
+    threads, results = run_concurrently(cache.get)
+    # Let every caller reach the cache before the one upstream call answers
+    threading.Timer(0.2, stub.release.set).start()
+    for thread in threads:
+        thread.join()
+    stub.delay.clear()
+    stub.release.clear()
+    return stub.issued == 1 and set(results) == {"token-1"}, f"{stub.issued} upstream calls for {THREADS} callers"
+
+
+def check_refresh_margin(stub, clock):
+    cache = AccessTokenCache(refresh_margin=60, clock=clock)
+    old = cache.get()
+    clock.now += 3599 - 30
+    stub.delay.set()
+    threads, results = run_concurrently(cache.get)
+    # Everyone but the refreshing caller returns before the stub answers
+    for thread in threads:
+        thread.join(1)
+    waiting = [thread for thread in threads if thread.is_alive()]
+    stub.release.set()
+    for thread in threads:
+        thread.join()
+    stub.delay.clear()
+    stub.release.clear()
+    new = cache.get()
+    ok = (len(waiting) == 1 and new != old and results.count(old) == THREADS - 1
+          and results.count(new) == 1 and stub.issued == 2)
+    return ok, f"{len(waiting)} refreshing, {results.count(old)} served the old token, {stub.issued - 1} refresh calls"
+
+
+def check_expires_in(stub, clock):
+    stub.expires_in = "120"
+    cache = AccessTokenCache(refresh_margin=60, clock=clock)
+    first = cache.get()
+    clock.now += 59
+    reused = cache.get() == first and stub.issued == 1
+    clock.now += 2
+    refreshed = cache.get() != first and stub.issued == 2
+    stub.expires_in = "3599"
+    return reused and refreshed, f"reused at 59s: {reused}, refreshed at 61s: {refreshed}"
+
+
+def check_failed_refresh(stub, clock):
+    cache = AccessTokenCache(refresh_margin=60, clock=clock)
+    token = cache.get()
+    clock.now += 3599 - 30
+    stub.failing = True
+    kept = cache.get() == token
+    clock.now += 30
+    try:
+        cache.get()
+        raised = False
+    except MpesaAuthError:
+        raised = True
+    stub.failing = False
+    return kept and raised, f"old token kept inside the margin: {kept}, error once expired: {raised}"
+
+
+def check_stk_retry(stub, clock):
+    mpesa_auth.token_cache.invalidate()
+    revoked = mpesa_auth.get_access_token()
+    stub.revoked.add(revoked)
+    response = send_stk_push("254700000000", 10, 1)
+    ok = (response.status_code == 200 and stub.pushes[0] == revoked and len(stub.pushes) == 2
+          and stub.pushes[1] != revoked and stub.issued == 2)
+    return ok, f"status {response.status_code}, pushes made with {stub.pushes}"
+
+
+CHECKS = [
+    ("concurrent get() makes one upstream call", check_cold_start),
+    ("one refresh inside the refresh margin", check_refresh_margin),
+    ("expires_in is honoured", check_expires_in),
+    ("failed refresh keeps the valid token", check_failed_refresh),
+    ("401 on STK push invalidates and retries once", check_stk_retry),
+]
+
+
+def main():
+    failures = 0
+    for name, check in CHECKS:
+        stub = StubDaraja()
+        os.environ.update({
+            "MPESA_BASE_URL": stub.serve(),
+            "MPESA_CONSUMER_KEY": "key",
+            "MPESA_CONSUMER_SECRET": "secret",
+            "MPESA_SHORTCODE": "174379",
+            "MPESA_PASSKEY": "passkey",
+            "BASE_URL": "http://127.0.0.1",
+        })
+        ok, detail = check(stub, Clock())
+        failures += not ok
+        print(f"{'ok' if ok else 'FAIL':4}  {name:46} {detail}")
+
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
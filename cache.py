@@ -0,0 +1,309 @@
+"""
+Caches shared by the resources.
+
+Every cache is a namespace on a backend chosen by the CACHE_URL setting:
+unset or memory:// keeps entries in a per-process LRU (`TTLCache`), while
+redis://, rediss:// and unix:// URLs store them in Redis (`RedisCache`) so
+all gunicorn workers see the same entries and the same invalidations.
+RedisCache works with any client that speaks the redis-py API; to run
+against a stand-in, pass one as the CACHE_REDIS_CLIENT setting, e.g.
+create_app({'CACHE_URL': 'redis://', 'CACHE_REDIS_CLIENT': fakeredis.FakeRedis()}).
+"""
+import json
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from hashlib import sha1
+
+
+class CacheBackend(ABC):
+    """Interface shared by the cache backends"""
+
+    @abstractmethod
+    def get(self, key, default=None):
+        pass
+
+    @abstractmethod
+    def set(self, key, value, ttl=None):
+        pass
+
+    @abstractmethod
+    def delete(self, key):
+        pass
+
+    @abstractmethod
+    def clear(self):
+        pass
+
+    @abstractmethod
+    def stats(self):
+        pass
+
+
+class TTLCache(CacheBackend):
+    """Thread-safe LRU cache whose entries also expire after `ttl` seconds"""
+
+    shared = False
+
+    def __init__(self, maxsize=1024, ttl=60):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] <= now:
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key, value, ttl=None):
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'memory',
+                'size': len(self._data),
+                'maxsize': self.maxsize,
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+class RedisCache(CacheBackend):
+    """
+    Cache entries stored in Redis under `<prefix><namespace>:`.
+
+    Values are stored as JSON, so tuples come back as lists; keys may be
+    anything with a stable repr() and are hashed. Size is bounded by the
+    TTLs and the server's maxmemory policy. Errors talking to Redis are
+    counted and treated as misses, so an outage slows requests down
+    instead of failing them.
+    """
+
+    shared = True
+
+    def __init__(self, client, namespace, ttl=60, prefix='cache:'):
+        self.client = client
+        self.ttl = ttl
+        self.prefix = f'{prefix}{namespace}:'
+        self.hits = 0
+        self.misses = 0
+        self.errors = 0
+        self._lock = threading.Lock()
+
+    def _key(self, key):
+        return self.prefix + sha1(repr(key).encode()).hexdigest()
+
+    def _count(self, counter):
+        with self._lock:
+            setattr(self, counter, getattr(self, counter) + 1)
+
+    def get(self, key, default=None):
+        try:
+            raw = self.client.get(self._key(key))
+        except Exception:
+            self._count('errors')
+            raw = None
+        if raw is None:
+            self._count('misses')
+            return default
+        self._count('hits')
+        return json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            self.client.set(self._key(key), json.dumps(value), px=max(int(ttl * 1000), 1))
+        except Exception:
+            self._count('errors')
+
+    def delete(self, key):
+        try:
+            self.client.delete(self._key(key))
+        except Exception:
+            self._count('errors')
+
+    def clear(self):
+        try:
+            keys = list(self.client.scan_iter(match=f'{self.prefix}*', count=500))
+            for start in range(0, len(keys), 500):
+                self.client.delete(*keys[start:start + 500])
+        except Exception:
+            self._count('errors')
+
+    def stats(self):
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'backend': 'redis',
+                'ttl': self.ttl,
+                'hits': self.hits,
+                'misses': self.misses,
+                'errors': self.errors,
+                'hit_rate': round(self.hits / lookups, 4) if lookups else None
+            }
+
+
+_redis_clients = {}
+
+
+def redis_client(url):
+    """One connection-pooled client per Redis URL"""
+    if url not in _redis_clients:
+        try:
+            import redis
+        except ImportError:
+            raise RuntimeError("CACHE_URL points at Redis but the redis package is not installed")
+        _redis_clients[url] = redis.Redis.from_url(url, socket_timeout=0.5, socket_connect_timeout=0.5)
+    return _redis_clients[url]
+
+
+def create_backend(app, namespace, maxsize, ttl):
+    """The backend app.config['CACHE_URL'] selects, for one cache namespace"""
+    url = app.config.get('CACHE_URL')
+    if not url or url.startswith('memory://'):
+        return TTLCache(maxsize=maxsize, ttl=ttl)
+    if url.split('://', 1)[0] in ('redis', 'rediss', 'unix'):
+        client = app.config.get('CACHE_REDIS_CLIENT') or redis_client(url)
+        return RedisCache(client, namespace, ttl=ttl, prefix=app.config.get('CACHE_KEY_PREFIX', 'cache:'))
+    raise ValueError(f"Unsupported CACHE_URL scheme: {url}")
+
+
+class Cache(CacheBackend):
+    """A named cache whose backend is picked when the app is initialized"""
+
+    def __init__(self, namespace, maxsize=1024, ttl=60):
+        self.namespace = namespace
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.backend = TTLCache(maxsize=maxsize, ttl=ttl)
+
+    def init_app(self, app):
+        self.backend = create_backend(app, self.namespace, self.maxsize, self.ttl)
+
+    @property
+    def shared(self):
+        """Whether every worker process sees the same entries"""
+        return self.backend.shared
+
+    def get(self, key, default=None):
+        return self.backend.get(key, default)
+
+    def set(self, key, value, ttl=None):
+        self.backend.set(key, value, ttl)
+
+    def delete(self, key):
+        self.backend.delete(key)
+
+    def clear(self):
+        self.backend.clear()
+
+    def stats(self):
+        return self.backend.stats()
+
+
+class CatalogCache:
+    """
+    Serialized product listings and single-product payloads.
+
+    Products only change through the admin endpoints, which call
+    `invalidate()` after committing; the TTL bounds staleness for any
+    other writer (seed scripts, manual SQL). Readers pass the `generation`
+    they started with to the setters so a payload built before an
+    invalidation in the same process is never stored after it.
+    """
+
+    def __init__(self, maxsize=512, ttl=300):
+        self._store = Cache('catalog', maxsize=maxsize, ttl=ttl)
+        self.generation = 0
+
+    def init_app(self, app):
+        self._store.maxsize = app.config.get('CATALOG_CACHE_SIZE', self._store.maxsize)
+        self._store.ttl = app.config.get('CATALOG_CACHE_TTL', self._store.ttl)
+        self._store.init_app(app)
+
+    def get_listing(self, args):
+        return self._store.get(('listing', args))
+
+    def set_listing(self, args, body, generation):
+        if generation == self.generation:
+            self._store.set(('listing', args), body)
+
+    def get_product(self, product_id):
+        return self._store.get(('product', product_id))
+
+    def set_product(self, product_id, payload, generation):
+        if generation == self.generation:
+            self._store.set(('product', product_id), payload)
+
+    def discard_products(self, product_ids):
+        # Stock changes at checkout: listings are keyed by the products'
+        # version stamp already, so only the per-product payloads go
+        self.generation += 1
+        for product_id in product_ids:
+            self._store.delete(('product', product_id))
+
+    def invalidate(self):
+        # Any product write can move it in or out of every cached listing page
+        self.generation += 1
+        self._store.clear()
+
+    def stats(self):
+        return {**self._store.stats(), 'invalidations': self.generation}
+
+
+catalog_cache = CatalogCache()
+
+
+# user id -> (role, is_approved). Filled from the database (for every user
+# unless the cache is shared, see decorators.current_role), and overwritten
+# by admin role changes so they take effect before existing tokens expire
+user_role_cache = Cache('user-roles', maxsize=10000, ttl=60)
+
+
+# CheckoutRequestIDs whose callback already reached a terminal state;
+# Safaricom replays callbacks, and replays are answered without a query
+processed_callbacks = Cache('mpesa-callbacks', maxsize=10000, ttl=3600)
+
+
+# The current Daraja access token, so workers reuse each other's token
+mpesa_token_store = Cache('mpesa-token', maxsize=1, ttl=3600)
+
+
+# Row counts for admin list filters that no analytics counter covers
+admin_counts = Cache('admin-counts', maxsize=1000, ttl=60)
+
+
+def init_caches(app):
+    """Point every cache at the backend configured by CACHE_URL"""
+    catalog_cache.init_app(app)
+    for cache in (user_role_cache, processed_callbacks, mpesa_token_store, admin_counts):
+        cache.init_app(app)
@@ -1,5 +1,7 @@
-from app import app, db
-from models import User
+from app import create_app
+from models import db, User
+
+app = create_app()
 
 with app.app_context():
     db.create_all()  # Ensure tables are created
@@ -0,0 +1,37 @@
+import click
+
+
+def register_commands(app):
+    """Maintenance commands, run with `flask <command>` (e.g. from cron)"""
+
+    @app.cli.command("refresh-dashboard")
+    def refresh_dashboard():
+        """Recompute the admin dashboard snapshot."""
+        from dashboard import refresh_dashboard_snapshot
+
+        snapshot = refresh_dashboard_snapshot()
+        click.echo(f"Dashboard snapshot refreshed at {snapshot.refreshed_at}")
+
+    @app.cli.command("rebuild-analytics")
+    def rebuild_analytics():
+        """Recompute every analytics counter from the source tables."""
+        from analytics import rebuild_counters
+
+        values = rebuild_counters()
+        click.echo(f"Rebuilt {len(values)} analytics counters")
+
+    @app.cli.command("rebuild-sales-rollups")
+    def rebuild_sales_rollups():
+        """Recompute the daily/weekly/monthly sales rollups from orders."""
+        from rollups import rebuild_rollups
+
+        count = rebuild_rollups()
+        click.echo(f"Rebuilt {count} sales rollup rows")
+
+    @app.cli.command("rebuild-search-index")
+    def rebuild_search_index():
+        """Refill the product full-text search index from the products table."""
+        from search import rebuild_search_index
+
+        count = rebuild_search_index()
+        click.echo(f"Indexed {count} products for search")
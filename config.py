@@ -0,0 +1,63 @@
+"""
+Application settings.
+
+.env is loaded here, once, and every setting is read from the environment
+when this module is first imported. `create_app` starts from `Config` and
+applies any overrides passed to it.
+"""
+import os
+from datetime import timedelta
+from dotenv import load_dotenv
+from db_pool import MeteredQueuePool
+
+load_dotenv()
+
+
+class Config:
+    SQLALCHEMY_DATABASE_URI = os.environ.get("DATABASE_URI")
+    SQLALCHEMY_TRACK_MODIFICATIONS = False
+    JWT_SECRET_KEY = os.environ.get("JWT_SECRET")
+    JWT_ACCESS_TOKEN_EXPIRES = timedelta(hours=24)
+    CACHE_URL = os.environ.get("CACHE_URL")
+    CACHE_KEY_PREFIX = os.environ.get("CACHE_KEY_PREFIX", "ray:")
+    # A redis-py compatible client to use instead of connecting to CACHE_URL
+    CACHE_REDIS_CLIENT = None
+    CATALOG_CACHE_TTL = int(os.environ.get("CATALOG_CACHE_TTL", 300))
+    CATALOG_CACHE_SIZE = int(os.environ.get("CATALOG_CACHE_SIZE", 512))
+    MPESA_ASYNC_WORKERS = int(os.environ.get("MPESA_ASYNC_WORKERS", 4))
+    DASHBOARD_SNAPSHOT_MAX_AGE = int(os.environ.get("DASHBOARD_SNAPSHOT_MAX_AGE", 300))
+    # Connection pool per worker process; see engine_options()
+    DB_POOL_SIZE = int(os.environ.get("DB_POOL_SIZE", 5))
+    DB_MAX_OVERFLOW = int(os.environ.get("DB_MAX_OVERFLOW", 10))
+    DB_POOL_TIMEOUT = float(os.environ.get("DB_POOL_TIMEOUT", 10))
+    DB_POOL_RECYCLE = int(os.environ.get("DB_POOL_RECYCLE", 1800))
+    DB_POOL_PRE_PING = os.environ.get("DB_POOL_PRE_PING", "true").lower() != "false"
+    DB_STATEMENT_TIMEOUT_MS = int(os.environ.get("DB_STATEMENT_TIMEOUT_MS", 0))
+    # Import resource modules on their first request instead of at startup
+    LAZY_RESOURCES = os.environ.get("LAZY_RESOURCES", "true").lower() != "false"
+
+
+def engine_options(config):
+    """
+    SQLALCHEMY_ENGINE_OPTIONS built from the DB_* settings in `config`.
+
+    SQLite keeps SQLAlchemy's default pool, which suits a file opened by
+    one process; only pre-ping applies. Elsewhere a MeteredQueuePool is
+    sized from the settings, and on PostgreSQL DB_STATEMENT_TIMEOUT_MS
+    sets statement_timeout on every new connection.
+    """
+    uri = config.get("SQLALCHEMY_DATABASE_URI") or ""
+    options = {"pool_pre_ping": config["DB_POOL_PRE_PING"]}
+    if uri.startswith("sqlite"):
+        return options
+
+    options.update(
+        poolclass=MeteredQueuePool,
+        pool_size=config["DB_POOL_SIZE"],
+        max_overflow=config["DB_MAX_OVERFLOW"],
+        pool_timeout=config["DB_POOL_TIMEOUT"],
+        pool_recycle=config["DB_POOL_RECYCLE"],
+    )
+    if uri.startswith("postgres") and config["DB_STATEMENT_TIMEOUT_MS"]:
+        options["connect_args"] = {"options": f"-c statement_timeout={config['DB_STATEMENT_TIMEOUT_MS']}"}
+    return options
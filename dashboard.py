@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta
+from sqlalchemy import func, select
+from models import db, User, Product, Order, OrderItem, SupportTicket, DashboardSnapshot
+from serializers import dashboard_snapshot_to_dict
+
+SNAPSHOT_ID = 1
+COUNTERS = (
+    'total_users', 'total_products', 'total_orders',
+    'total_tickets', 'pending_tickets', 'total_revenue'
+)
+
+
+def dashboard_counters():
+    """Every dashboard counter in one round-trip, as scalar subqueries of a single SELECT"""
+    row = db.session.execute(select(
+        select(func.count(User.id)).scalar_subquery().label('total_users'),
+        select(func.count(Product.id)).scalar_subquery().label('total_products'),
+        select(func.count(Order.id)).scalar_subquery().label('total_orders'),
+        select(func.count(SupportTicket.id)).scalar_subquery().label('total_tickets'),
+        select(func.count(SupportTicket.id)).where(SupportTicket.status == 'open')
+            .scalar_subquery().label('pending_tickets'),
+        select(func.coalesce(func.sum(OrderItem.total_price), 0)).scalar_subquery().label('total_revenue'),
+    )).one()
+
+    counters = dict(row._mapping)
+    counters['total_revenue'] = float(counters['total_revenue'])
+    return counters
+
+
+def _upsert_snapshot(values):
+    table = DashboardSnapshot.__table__
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+    if dialect in ('sqlite', 'postgresql'):
+        if dialect == 'sqlite':
+            from sqlalchemy.dialects.sqlite import insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert
+        stmt = insert(table).values(id=SNAPSHOT_ID, **values)
+        connection.execute(stmt.on_conflict_do_update(index_elements=['id'], set_=values))
+        return
+
+    if connection.execute(table.update().where(table.c.id == SNAPSHOT_ID).values(values)).rowcount == 0:
+        connection.execute(table.insert().values(id=SNAPSHOT_ID, **values))
+
+
+def refresh_dashboard_snapshot():
+    """Recompute the counters and write them to the snapshot row (flask refresh-dashboard)"""
+    _upsert_snapshot({**dashboard_counters(), 'refreshed_at': datetime.now()})
+    db.session.commit()
+    return db.session.get(DashboardSnapshot, SNAPSHOT_ID, populate_existing=True)
+
+
+def read_dashboard_snapshot(max_age):
+    """
+    Dashboard counters from the snapshot row (one primary-key read). Never
+    writes: a missing snapshot, or one older than `max_age` seconds, is
+    answered with live counters until flask refresh-dashboard runs again.
+    """
+    snapshot = db.session.get(DashboardSnapshot, SNAPSHOT_ID)
+    if snapshot is None or snapshot.refreshed_at < datetime.now() - timedelta(seconds=max_age):
+        return {**dashboard_counters(), 'refreshed_at': None}
+    return dashboard_snapshot_to_dict(snapshot)
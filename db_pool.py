@@ -0,0 +1,61 @@
+import threading
+import time
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
+from sqlalchemy.pool import QueuePool
+
+
+class MeteredQueuePool(QueuePool):
+    """
+    QueuePool that records how long each checkout waited.
+
+    The wait covers queueing for a free connection and, while the pool is
+    below its limit, opening a new one; checkouts that give up after
+    pool_timeout are counted separately. Figures are per process.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self._metrics_lock = threading.Lock()
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            with self._metrics_lock:
+                self.timeouts += 1
+            raise
+        waited = time.perf_counter() - start
+        with self._metrics_lock:
+            self.checkouts += 1
+            self.wait_total += waited
+            self.wait_max = max(self.wait_max, waited)
+        return connection
+
+
+def pool_stats(engine):
+    """Connection pool usage for /admin/metrics"""
+    pool = engine.pool
+    stats = {'class': type(pool).__name__}
+    if isinstance(pool, QueuePool):
+        stats.update({
+            'size': pool.size(),
+            'in_use': pool.checkedout(),
+            'idle': pool.checkedin(),
+            'overflow': max(pool.overflow(), 0),
+            'max_overflow': pool._max_overflow,
+            'timeout': pool.timeout(),
+        })
+    if isinstance(pool, MeteredQueuePool):
+        with pool._metrics_lock:
+            stats.update({
+                'checkouts': pool.checkouts,
+                'checkout_timeouts': pool.timeouts,
+                'avg_wait_ms': round(pool.wait_total / pool.checkouts * 1000, 2) if pool.checkouts else None,
+                'max_wait_ms': round(pool.wait_max * 1000, 2),
+            })
+    return stats
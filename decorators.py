@@ -0,0 +1,56 @@
+from functools import wraps
+from flask import current_app
+from flask_jwt_extended import get_jwt, get_jwt_identity, jwt_required
+from cache import user_role_cache
+from models import User
+
+
+def role_claims(user):
+    """Additional JWT claims that let handlers authorize without a User lookup (with a shared role cache)"""
+    return {"role": user.role, "is_approved": user.is_approved}
+
+
+def remember_role(user_id, role, is_approved):
+    """Record a role change so it overrides claims in tokens already issued"""
+    # A shared cache must hold the override for as long as those tokens
+    # live; a per-process one is reloaded from the database anyway
+    ttl = current_app.config["JWT_ACCESS_TOKEN_EXPIRES"].total_seconds() if user_role_cache.shared else None
+    user_role_cache.set(user_id, (role, is_approved), ttl=ttl)
+
+
+def current_role():
+    """
+    (role, is_approved) of the user making the request.
+
+    Role claims are trusted only when user_role_cache is shared by every
+    worker (CACHE_URL=redis://...), because that is where admin changes
+    record their overrides. A per-process cache only holds overrides made
+    by its own worker, so there roles come from the database and are
+    cached for the cache TTL (60s), which bounds how long a demoted or
+    deleted user keeps their old access.
+    """
+    user_id = get_jwt_identity()
+    state = user_role_cache.get(user_id)
+    if state is not None:
+        return state
+
+    claims = get_jwt()
+    if user_role_cache.shared and "role" in claims:
+        return claims["role"], claims.get("is_approved")
+
+    user = User.query.get(user_id)
+    state = (user.role, user.is_approved) if user else (None, False)
+    user_role_cache.set(user_id, state)
+    return state
+
+
+def admin_required(fn):
+    """jwt_required() plus an admin role check (see current_role)"""
+    @wraps(fn)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        role, _ = current_role()
+        if role != 'admin':
+            return {'message': 'Unauthorized'}, 403
+        return fn(*args, **kwargs)
+    return wrapper
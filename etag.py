@@ -0,0 +1,41 @@
+from hashlib import sha1
+from flask import Response, request
+from sqlalchemy import func, select
+from models import db, AnalyticsCounter
+
+
+def version_stamp(column, id_column, *criteria):
+    """(max(updated_at), count) for the rows matching `criteria` in one query"""
+    return db.session.query(func.max(column), func.count(id_column)).filter(*criteria).one()
+
+
+def counter_stamp(column, counter):
+    """
+    (max(updated_at), analytics counter `counter`) in one query. For whole
+    tables, where count() would scan every row: the max comes from an index
+    on `column` and the counter, which moves on deletes, is a primary-key read.
+    """
+    counters = AnalyticsCounter.__table__
+    return db.session.execute(select(
+        select(func.max(column)).scalar_subquery(),
+        select(counters.c.value).where(counters.c.name == counter).scalar_subquery()
+    )).one()
+
+
+def make_etag(*parts):
+    """Strong ETag for a response that is fully determined by `parts`"""
+    return sha1(repr(parts).encode()).hexdigest()
+
+
+def etag_headers(etag, private=False):
+    return {
+        'ETag': f'"{etag}"',
+        'Cache-Control': 'private, no-cache' if private else 'no-cache'
+    }
+
+
+def not_modified(etag, private=False):
+    """A 304 response if the client's If-None-Match already holds `etag`, else None"""
+    if request.if_none_match.contains_weak(etag):
+        return Response(status=304, headers=etag_headers(etag, private))
+    return None
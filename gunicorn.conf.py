@@ -0,0 +1,63 @@
+"""
+Gunicorn settings, read by `gunicorn -c gunicorn.conf.py app:app`.
+
+Every value can be overridden from the environment (see README, "Running
+in production"). The default worker class is gthread: payment endpoints
+spend most of their time waiting on Daraja, and threads keep the other
+requests moving while a few workers wait. GUNICORN_WORKER_CLASS=gevent
+serves even more concurrent slow calls per worker; sync is available for
+comparison and for CPU-bound deployments.
+"""
+import multiprocessing
+import os
+
+
+def _env_bool(name, default):
+    return os.environ.get(name, str(default)).lower() in ("1", "true", "yes")
+
+
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+
+if worker_class == "gevent":
+    # Patch before the app (and with it requests/urllib3) is preloaded
+    from gevent import monkey
+    monkey.patch_all()
+
+bind = os.environ.get("GUNICORN_BIND", f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+
+# (2 x cores) + 1 sync workers keeps the CPUs busy while some wait on I/O;
+# thread and greenlet workers add their concurrency on top of that
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+threads = int(os.environ.get("GUNICORN_THREADS", 8 if worker_class == "gthread" else 1))
+worker_connections = int(os.environ.get("GUNICORN_WORKER_CONNECTIONS", 200))
+
+# Build the app once in the master and fork it, so workers start fast and
+# share its memory; resources are then imported up front rather than lazily
+preload_app = _env_bool("GUNICORN_PRELOAD", True)
+if preload_app:
+    os.environ.setdefault("LAZY_RESOURCES", "false")
+
+# Recycle workers to bound slow memory growth; jitter keeps them from
+# restarting all at once
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", 100))
+
+# An STK push can take connect + read timeout times the retry budget
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", 60))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", 5))
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-") or None
+errorlog = "-"
+loglevel = os.environ.get("GUNICORN_LOG_LEVEL", "info")
+
+
+def post_fork(server, worker):
+    # Connections opened in the master must not be shared with the workers
+    import app as app_module
+
+    if app_module._app is not None:
+        from models import db
+
+        with app_module._app.app_context():
+            db.engine.dispose(close=False)
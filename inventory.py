@@ -0,0 +1,59 @@
+from datetime import datetime
+from sqlalchemy import case, select, update
+from models import db, Product
+from analytics import LOW_STOCK_THRESHOLD, add_deltas
+
+products = Product.__table__
+
+
+class OutOfStockError(RuntimeError):
+    """Raised when some cart lines cannot be covered by the remaining stock."""
+
+    def __init__(self, product_ids):
+        super().__init__(f"Insufficient stock for products {product_ids}")
+        self.product_ids = product_ids
+
+
+def reserve_stock(quantities):
+    """
+    Take {product_id: quantity} out of stock in one conditional UPDATE.
+
+    Each row is decremented only if it still holds enough stock, so the
+    check and the write happen under the row lock the UPDATE takes anyway:
+    concurrent checkouts never oversell and never wait on a separate
+    SELECT .. FOR UPDATE. Raises OutOfStockError listing the products that
+    fell short; the caller must roll back, as the other rows were already
+    decremented in the current transaction.
+    """
+    ids = sorted(quantities)
+    wanted = case(quantities, value=products.c.id)
+    stmt = (
+        update(products)
+        .where(products.c.id.in_(ids), products.c.stock >= wanted)
+        .values(stock=products.c.stock - wanted, updated_at=datetime.now())
+    )
+
+    connection = db.session.connection()
+    if connection.dialect.update_returning:
+        remaining = dict(connection.execute(stmt.returning(products.c.id, products.c.stock)).all())
+    else:
+        # Without RETURNING a partial update cannot tell which lines fell
+        # short, so every line is reported
+        remaining = {}
+        if connection.execute(stmt).rowcount == len(ids):
+            remaining = dict(connection.execute(
+                select(products.c.id, products.c.stock).where(products.c.id.in_(ids))
+            ).all())
+
+    short = [product_id for product_id in ids if product_id not in remaining]
+    if short:
+        raise OutOfStockError(short)
+
+    # The bulk UPDATE bypasses the flush hooks behind products.low_stock
+    crossed = sum(
+        1 for product_id, stock in remaining.items()
+        if stock < LOW_STOCK_THRESHOLD <= stock + quantities[product_id]
+    )
+    if crossed:
+        add_deltas(connection, {'products.low_stock': crossed})
+    return remaining
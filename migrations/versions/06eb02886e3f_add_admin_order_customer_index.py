@@ -0,0 +1,26 @@
+"""Add admin order customer index
+
+Revision ID: 06eb02886e3f
+Revises: e5a9c1d7b3f2
+Create Date: 2026-10-18 20:03:41.218554
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '06eb02886e3f'
+down_revision = 'e5a9c1d7b3f2'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_customer_id_id', ['customer_id', 'id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_customer_id_id')
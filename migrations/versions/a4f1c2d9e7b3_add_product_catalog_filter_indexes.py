@@ -0,0 +1,34 @@
+"""Add product catalog filter indexes
+
+Revision ID: a4f1c2d9e7b3
+Revises: 5bd1b5cb4c53
+Create Date: 2026-10-18 09:12:31.482190
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a4f1c2d9e7b3'
+down_revision = '5bd1b5cb4c53'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_index('ix_products_category_id_price', ['category_id', 'price'], unique=False)
+        batch_op.create_index('ix_products_is_popular', ['is_popular'], unique=False)
+
+    with op.batch_alter_table('product_tags', schema=None) as batch_op:
+        batch_op.create_index('ix_product_tags_tag_id_product_id', ['tag_id', 'product_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('product_tags', schema=None) as batch_op:
+        batch_op.drop_index('ix_product_tags_tag_id_product_id')
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index('ix_products_is_popular')
+        batch_op.drop_index('ix_products_category_id_price')
@@ -0,0 +1,75 @@
+"""Add foreign key lookup indexes
+
+Revision ID: b52e9d4a7c13
+Revises: f3c8a7e2b514
+Create Date: 2026-10-18 16:40:12.904317
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b52e9d4a7c13'
+down_revision = 'f3c8a7e2b514'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Merge duplicate cart lines into the oldest one before making
+    # (user_id, product_id) unique
+    op.execute(
+        "UPDATE cart_items SET quantity = ("
+        " SELECT SUM(c.quantity) FROM cart_items c"
+        " WHERE c.user_id = cart_items.user_id AND c.product_id = cart_items.product_id)"
+        " WHERE id IN ("
+        " SELECT MIN(id) FROM cart_items GROUP BY user_id, product_id HAVING COUNT(*) > 1)"
+    )
+    op.execute(
+        "DELETE FROM cart_items WHERE id NOT IN ("
+        " SELECT keep.id FROM (SELECT MIN(id) AS id FROM cart_items GROUP BY user_id, product_id) keep)"
+    )
+
+    with op.batch_alter_table('cart_items', schema=None) as batch_op:
+        batch_op.create_index('ix_cart_items_user_id_product_id', ['user_id', 'product_id'], unique=True)
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_customer_id_created_at', ['customer_id', sa.text('created_at DESC')], unique=False)
+
+    with op.batch_alter_table('order_items', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_order_items_order_id'), ['order_id'], unique=False)
+
+    with op.batch_alter_table('support_tickets', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_support_tickets_user_id'), ['user_id'], unique=False)
+
+    # transaction.user_id and users.phone were added to the models without
+    # a migration; databases built from the migrations alone lack them
+    inspector = sa.inspect(op.get_bind())
+    if 'phone' not in {c['name'] for c in inspector.get_columns('users')}:
+        with op.batch_alter_table('users', schema=None) as batch_op:
+            batch_op.add_column(sa.Column('phone', sa.String(length=20), nullable=True))
+
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        if 'user_id' not in {c['name'] for c in inspector.get_columns('transaction')}:
+            batch_op.add_column(sa.Column('user_id', sa.Integer(), nullable=True))
+            batch_op.create_foreign_key(batch_op.f('fk_transaction_user_id_users'), 'users', ['user_id'], ['id'])
+        batch_op.create_index(batch_op.f('ix_transaction_user_id'), ['user_id'], unique=False)
+
+
+def downgrade():
+    # transaction.user_id and users.phone stay: the models depend on them
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_transaction_user_id'))
+
+    with op.batch_alter_table('support_tickets', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_support_tickets_user_id'))
+
+    with op.batch_alter_table('order_items', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_order_items_order_id'))
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_customer_id_created_at')
+
+    with op.batch_alter_table('cart_items', schema=None) as batch_op:
+        batch_op.drop_index('ix_cart_items_user_id_product_id')
@@ -0,0 +1,44 @@
+"""Add updated_at to products, orders and transaction
+
+Revision ID: c7e3b5a1f902
+Revises: a4f1c2d9e7b3
+Create Date: 2026-10-18 11:40:05.913274
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c7e3b5a1f902'
+down_revision = 'a4f1c2d9e7b3'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+        batch_op.create_index(batch_op.f('ix_products_updated_at'), ['updated_at'], unique=False)
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('updated_at', sa.DateTime(), nullable=True))
+
+    # Existing rows start from their creation time
+    op.execute("UPDATE orders SET updated_at = created_at")
+    op.execute("UPDATE \"transaction\" SET updated_at = created_at")
+
+
+def downgrade():
+    with op.batch_alter_table('transaction', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_column('updated_at')
+
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_products_updated_at'))
+        batch_op.drop_column('updated_at')
@@ -0,0 +1,48 @@
+"""Add admin list filter indexes and order status counters
+
+Revision ID: c84f2a6d1e39
+Revises: b52e9d4a7c13
+Create Date: 2026-10-18 18:05:47.316920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c84f2a6d1e39'
+down_revision = 'b52e9d4a7c13'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_role_id', ['role', 'id'], unique=False)
+        batch_op.create_index('ix_users_is_approved_id', ['is_approved', 'id'], unique=False)
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.create_index('ix_orders_status_id', ['status', 'id'], unique=False)
+
+    with op.batch_alter_table('support_tickets', schema=None) as batch_op:
+        batch_op.create_index('ix_support_tickets_status_id', ['status', 'id'], unique=False)
+
+    # Backfill; same names as analytics.compute_counters()
+    op.execute(
+        "INSERT INTO analytics_counters (name, value) "
+        "SELECT 'orders.status:' || COALESCE(status, 'None'), COUNT(*) FROM orders GROUP BY status"
+    )
+
+
+def downgrade():
+    op.execute("DELETE FROM analytics_counters WHERE name LIKE 'orders.status:%'")
+
+    with op.batch_alter_table('support_tickets', schema=None) as batch_op:
+        batch_op.drop_index('ix_support_tickets_status_id')
+
+    with op.batch_alter_table('orders', schema=None) as batch_op:
+        batch_op.drop_index('ix_orders_status_id')
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_is_approved_id')
+        batch_op.drop_index('ix_users_role_id')
@@ -0,0 +1,34 @@
+"""Add dashboard snapshot table
+
+Revision ID: d2a86f4c9b17
+Revises: c7e3b5a1f902
+Create Date: 2026-10-18 14:02:47.205518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd2a86f4c9b17'
+down_revision = 'c7e3b5a1f902'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('dashboard_snapshots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('total_users', sa.Integer(), nullable=False),
+    sa.Column('total_products', sa.Integer(), nullable=False),
+    sa.Column('total_orders', sa.Integer(), nullable=False),
+    sa.Column('total_tickets', sa.Integer(), nullable=False),
+    sa.Column('pending_tickets', sa.Integer(), nullable=False),
+    sa.Column('total_revenue', sa.Float(), nullable=False),
+    sa.Column('refreshed_at', sa.DateTime(), nullable=False),
+    sa.PrimaryKeyConstraint('id', name=op.f('pk_dashboard_snapshots'))
+    )
+
+
+def downgrade():
+    op.drop_table('dashboard_snapshots')
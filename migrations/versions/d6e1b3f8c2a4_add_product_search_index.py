@@ -0,0 +1,57 @@
+"""Add product full-text search index
+
+Revision ID: d6e1b3f8c2a4
+Revises: c84f2a6d1e39
+Create Date: 2026-10-18 19:22:36.508114
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd6e1b3f8c2a4'
+down_revision = 'c84f2a6d1e39'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Same layout as search.py; other databases have no index and search
+    # falls back to LIKE
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE product_search USING fts5("
+            "name, short_description, description, tags, "
+            "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+        )
+        op.execute(
+            "INSERT INTO product_search (rowid, name, short_description, description, tags) "
+            "SELECT p.id, COALESCE(p.name, ''), COALESCE(p.short_description, ''), COALESCE(p.description, ''), "
+            "COALESCE((SELECT group_concat(t.name, ' ') FROM product_tags pt "
+            "JOIN tags t ON t.id = pt.tag_id WHERE pt.product_id = p.id), '') "
+            "FROM products p"
+        )
+    elif dialect == 'postgresql':
+        op.execute(
+            "CREATE TABLE product_search ("
+            "product_id INTEGER PRIMARY KEY REFERENCES products (id) ON DELETE CASCADE, "
+            "document TSVECTOR NOT NULL)"
+        )
+        op.execute(
+            "INSERT INTO product_search (product_id, document) "
+            "SELECT p.id, "
+            "setweight(to_tsvector('simple', COALESCE(p.name, '')), 'A') || "
+            "setweight(to_tsvector('simple', COALESCE((SELECT string_agg(t.name, ' ') FROM product_tags pt "
+            "JOIN tags t ON t.id = pt.tag_id WHERE pt.product_id = p.id), '')), 'B') || "
+            "setweight(to_tsvector('simple', COALESCE(p.short_description, '')), 'C') || "
+            "setweight(to_tsvector('simple', COALESCE(p.description, '')), 'D') "
+            "FROM products p"
+        )
+        op.execute("CREATE INDEX ix_product_search_document ON product_search USING GIN (document)")
+
+
+def downgrade():
+    if op.get_bind().dialect.name in ('sqlite', 'postgresql'):
+        op.execute("DROP TABLE product_search")
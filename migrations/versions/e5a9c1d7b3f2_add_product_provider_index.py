@@ -0,0 +1,26 @@
+"""Add product provider lookup index
+
+Revision ID: e5a9c1d7b3f2
+Revises: d6e1b3f8c2a4
+Create Date: 2026-10-18 19:12:08.604113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e5a9c1d7b3f2'
+down_revision = 'd6e1b3f8c2a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_products_provider_id'), ['provider_id'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('products', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_products_provider_id'))
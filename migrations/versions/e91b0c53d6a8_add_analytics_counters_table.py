@@ -0,0 +1,47 @@
+"""Add analytics counters table
+
+Revision ID: e91b0c53d6a8
+Revises: d2a86f4c9b17
+Create Date: 2026-10-18 15:26:12.774031
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e91b0c53d6a8'
+down_revision = 'd2a86f4c9b17'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('analytics_counters',
+    sa.Column('name', sa.String(length=120), nullable=False),
+    sa.Column('value', sa.Float(), nullable=False),
+    sa.PrimaryKeyConstraint('name', name=op.f('pk_analytics_counters'))
+    )
+
+    # Backfill from the existing rows; same names as analytics.compute_counters()
+    flag = "CASE WHEN {0} IS NULL THEN 'none' WHEN {0} THEN 'true' ELSE 'false' END"
+    category = "COALESCE(CAST(category_id AS VARCHAR(20)), 'none')"
+    for statement in (
+        "SELECT 'users.total', COUNT(*) FROM users",
+        "SELECT 'users.role:' || role, COUNT(*) FROM users GROUP BY role",
+        f"SELECT 'users.approved:' || {flag.format('is_approved')}, COUNT(*) FROM users "
+        f"GROUP BY {flag.format('is_approved')}",
+        "SELECT 'tickets.total', COUNT(*) FROM support_tickets",
+        "SELECT 'tickets.status:' || COALESCE(status, 'None'), COUNT(*) FROM support_tickets GROUP BY status",
+        "SELECT 'products.total', COUNT(*) FROM products",
+        f"SELECT 'products.category:' || {category}, COUNT(*) FROM products GROUP BY {category}",
+        "SELECT 'products.popular', COUNT(*) FROM products WHERE is_popular",
+        "SELECT 'products.low_stock', COUNT(*) FROM products WHERE stock < 5",
+        "SELECT 'orders.total', COUNT(*) FROM orders",
+        "SELECT 'order_items.revenue', COALESCE(SUM(total_price), 0) FROM order_items",
+    ):
+        op.execute(f"INSERT INTO analytics_counters (name, value) {statement}")
+
+
+def downgrade():
+    op.drop_table('analytics_counters')
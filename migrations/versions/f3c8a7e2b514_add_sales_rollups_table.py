@@ -0,0 +1,79 @@
+"""Add sales rollups table
+
+Revision ID: f3c8a7e2b514
+Revises: e91b0c53d6a8
+Create Date: 2026-10-18 16:02:41.318207
+
+"""
+from collections import defaultdict
+from datetime import datetime, timedelta
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c8a7e2b514'
+down_revision = 'e91b0c53d6a8'
+branch_labels = None
+depends_on = None
+
+
+def _buckets(created_at):
+    # Same buckets as rollups.bucket_start()
+    if isinstance(created_at, str):
+        created_at = datetime.fromisoformat(created_at)
+    day = created_at.date()
+    return (
+        ('day', day),
+        ('week', day - timedelta(days=day.weekday())),
+        ('month', day.replace(day=1)),
+    )
+
+
+def upgrade():
+    sales_rollups = op.create_table('sales_rollups',
+    sa.Column('period', sa.String(length=5), nullable=False),
+    sa.Column('category_id', sa.Integer(), nullable=False),
+    sa.Column('product_id', sa.Integer(), nullable=False),
+    sa.Column('bucket', sa.Date(), nullable=False),
+    sa.Column('revenue', sa.Float(), nullable=False),
+    sa.Column('orders', sa.Integer(), nullable=False),
+    sa.Column('units', sa.Integer(), nullable=False),
+    sa.PrimaryKeyConstraint('period', 'category_id', 'product_id', 'bucket', name=op.f('pk_sales_rollups'))
+    )
+
+    # Backfill from existing orders; same totals as rollups.rebuild_rollups()
+    rows = op.get_bind().execute(sa.text(
+        "SELECT o.id, o.created_at, i.product_id, p.category_id, i.quantity, i.total_price "
+        "FROM orders o "
+        "LEFT OUTER JOIN order_items i ON i.order_id = o.id "
+        "LEFT OUTER JOIN products p ON p.id = i.product_id "
+        "WHERE o.created_at IS NOT NULL "
+        "AND (o.status IS NULL OR o.status NOT IN ('cancelled', 'canceled', 'refunded')) "
+        "ORDER BY o.id"
+    ))
+    totals = defaultdict(lambda: [0.0, 0, 0])
+    orders = defaultdict(set)
+    for order_id, created_at, product_id, category_id, quantity, revenue in rows:
+        for period, bucket in _buckets(created_at):
+            scopes = [(period, 0, 0, bucket)]
+            if category_id is not None:
+                scopes.append((period, category_id, 0, bucket))
+            if product_id is not None:
+                scopes.append((period, 0, product_id, bucket))
+            for key in scopes:
+                orders[key].add(order_id)
+                if quantity is not None:
+                    totals[key][0] += revenue or 0
+                    totals[key][2] += quantity
+    if orders:
+        op.bulk_insert(sales_rollups, [
+            {'period': period, 'category_id': category_id, 'product_id': product_id, 'bucket': bucket,
+             'revenue': totals[key][0], 'orders': len(order_ids), 'units': totals[key][2]}
+            for key, order_ids in orders.items()
+            for period, category_id, product_id, bucket in (key,)
+        ])
+
+
+def downgrade():
+    op.drop_table('sales_rollups')
@@ -1,6 +1,6 @@
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import MetaData
-from sqlalchemy.orm import validates
+from sqlalchemy.orm import validates, joinedload, selectinload
 from sqlalchemy_serializer import SerializerMixin
 from datetime import datetime
 import re
@@ -59,6 +59,12 @@ class User(db.Model, SerializerMixin):
     serialize_only = ("id", "first_name", "last_name", "email", "phone", "role", "is_approved")
     serialize_rules = ("-password_hash", "-products.provider", "-orders.customer", "-tickets.user")
 
+    # Admin user list filters, each paged in id order
+    __table_args__ = (
+        db.Index('ix_users_role_id', 'role', 'id'),
+        db.Index('ix_users_is_approved_id', 'is_approved', 'id'),
+    )
+
 
 # =========================================================
 # 2. TAG MODEL – For product filtering and feature labels
@@ -66,7 +72,8 @@ class User(db.Model, SerializerMixin):
 product_tags = db.Table(
     'product_tags',
     db.Column('product_id', db.Integer, db.ForeignKey('products.id')),
-    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id'))
+    db.Column('tag_id', db.Integer, db.ForeignKey('tags.id')),
+    db.Index('ix_product_tags_tag_id_product_id', 'tag_id', 'product_id')
 )
 
 class Tag(db.Model, SerializerMixin):
@@ -115,8 +122,9 @@ class Product(db.Model, SerializerMixin):
     rating = db.Column(db.Float, default=0)
     num_reviews = db.Column(db.Integer, default=0)
     is_popular = db.Column(db.Boolean, default=False)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now, index=True)
 
-    provider_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    provider_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
     category_id = db.Column(db.Integer, db.ForeignKey('categories.id'), nullable=True)
 
     provider = db.relationship('User', back_populates='products')
@@ -135,6 +143,23 @@ class Product(db.Model, SerializerMixin):
     )
     serialize_rules = ("-provider.products", "-order_items.product", "-tags.products", "-category.products")
 
+    # Catalog filters: category listings sorted by price, popular-only listings
+    __table_args__ = (
+        db.Index('ix_products_category_id_price', 'category_id', 'price'),
+        db.Index('ix_products_is_popular', 'is_popular'),
+    )
+
+
+def product_load_options():
+    """Eager loads for the relationships Product.serialize_only reads
+    (provider_name, category.name, tags.name) so serializing a listing
+    doesn't lazy-load per row."""
+    return (
+        joinedload(Product.provider),
+        joinedload(Product.category),
+        selectinload(Product.tags),
+    )
+
 
 # ================================================
 # 5. ORDER MODEL – Cart + Checkout History
@@ -145,6 +170,7 @@ class Order(db.Model, SerializerMixin):
     id = db.Column(db.Integer, primary_key=True)
     status = db.Column(db.String(50), default='pending')
     created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
 
     customer_id = db.Column(db.Integer, db.ForeignKey('users.id'))
 
@@ -153,6 +179,14 @@ class Order(db.Model, SerializerMixin):
 
     serialize_only = ("id", "status", "created_at", "customer_id", "items")
 
+    # A customer's order history, newest first, straight off the index;
+    # the admin order list by status or by customer, paged in id order
+    __table_args__ = (
+        db.Index('ix_orders_customer_id_created_at', customer_id, created_at.desc()),
+        db.Index('ix_orders_status_id', 'status', 'id'),
+        db.Index('ix_orders_customer_id_id', 'customer_id', 'id'),
+    )
+
 
 class OrderItem(db.Model, SerializerMixin):
     __tablename__ = 'order_items'
@@ -162,7 +196,7 @@ class OrderItem(db.Model, SerializerMixin):
     unit_price = db.Column(db.Float, nullable=False)
     total_price = db.Column(db.Float, nullable=False)
 
-    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'))
+    order_id = db.Column(db.Integer, db.ForeignKey('orders.id'), index=True)
     product_id = db.Column(db.Integer, db.ForeignKey('products.id'))
 
     order = db.relationship('Order', back_populates='items')
@@ -184,12 +218,17 @@ class SupportTicket(db.Model, SerializerMixin):
     status = db.Column(db.String(50), default='open')
     created_at = db.Column(db.DateTime, default=datetime.now)
 
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
 
     user = db.relationship('User', back_populates='tickets')
 
     serialize_only = ("id", "subject", "message", "response", "status", "created_at", "user_id")
 
+    # Admin ticket list by status, paged in id order
+    __table_args__ = (
+        db.Index('ix_support_tickets_status_id', 'status', 'id'),
+    )
+
 
 # ===========================================
 # 7. TRANSACTION MODEL – M-Pesa transactions
@@ -206,9 +245,10 @@ class Transaction(db.Model, SerializerMixin):
     result_desc = db.Column(db.String(255))
     status = db.Column(db.String(20))
     created_at = db.Column(db.DateTime, default=datetime.now)
+    updated_at = db.Column(db.DateTime, default=datetime.now, onupdate=datetime.now)
     
     # Add user relationship
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'))
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), index=True)
     user = db.relationship('User', backref='transactions')
 
     serialize_only = (
@@ -241,3 +281,64 @@ class CartItem(db.Model, SerializerMixin):
     serialize_only = (
         "id", "user_id", "product_id", "quantity", "price", "name", "image"
     )
+
+    # One line per product in a cart; also serves lookups by user_id alone
+    __table_args__ = (
+        db.Index('ix_cart_items_user_id_product_id', 'user_id', 'product_id', unique=True),
+    )
+
+
+# ===================================================
+# 9. DASHBOARD SNAPSHOT – Precomputed admin counters
+# ===================================================
+class DashboardSnapshot(db.Model, SerializerMixin):
+    __tablename__ = 'dashboard_snapshots'
+
+    # Single row (id=1), rewritten by dashboard.refresh_dashboard_snapshot()
+    id = db.Column(db.Integer, primary_key=True)
+    total_users = db.Column(db.Integer, nullable=False, default=0)
+    total_products = db.Column(db.Integer, nullable=False, default=0)
+    total_orders = db.Column(db.Integer, nullable=False, default=0)
+    total_tickets = db.Column(db.Integer, nullable=False, default=0)
+    pending_tickets = db.Column(db.Integer, nullable=False, default=0)
+    total_revenue = db.Column(db.Float, nullable=False, default=0)
+    refreshed_at = db.Column(db.DateTime, nullable=False, default=datetime.now)
+
+    serialize_only = (
+        "total_users", "total_products", "total_orders", "total_tickets",
+        "pending_tickets", "total_revenue", "refreshed_at"
+    )
+
+
+# ======================================================
+# 10. ANALYTICS COUNTER MODEL – Incremental aggregates
+# ======================================================
+class AnalyticsCounter(db.Model, SerializerMixin):
+    __tablename__ = 'analytics_counters'
+
+    # e.g. "users.total", "users.role:admin", "tickets.status:open"; kept in
+    # step with the source tables by the session hooks in analytics.py
+    name = db.Column(db.String(120), primary_key=True)
+    value = db.Column(db.Float, nullable=False, default=0)
+
+    serialize_only = ("name", "value")
+
+
+# ====================================================
+# 11. SALES ROLLUP MODEL – Revenue per period bucket
+# ====================================================
+class SalesRollup(db.Model, SerializerMixin):
+    __tablename__ = 'sales_rollups'
+
+    # One row per (period, scope, bucket). category_id = 0 and product_id = 0
+    # mean "all"; rows are maintained by the session hooks in rollups.py
+    period = db.Column(db.String(5), primary_key=True)
+    category_id = db.Column(db.Integer, primary_key=True, default=0)
+    product_id = db.Column(db.Integer, primary_key=True, default=0)
+    bucket = db.Column(db.Date, primary_key=True)
+
+    revenue = db.Column(db.Float, nullable=False, default=0)
+    orders = db.Column(db.Integer, nullable=False, default=0)
+    units = db.Column(db.Integer, nullable=False, default=0)
+
+    serialize_only = ("period", "category_id", "product_id", "bucket", "revenue", "orders", "units")
@@ -1,18 +1,125 @@
 
 import os
-import requests
-from dotenv import load_dotenv
+import threading
+import time
 from requests.auth import HTTPBasicAuth
+from mpesa_client import mpesa_client
+from cache import mpesa_token_store
+import config  # noqa: F401 (loads .env before the settings below are read)
 
-load_dotenv()
+# Daraja tokens live for an hour; refresh a minute early so a token never
+# expires between being handed out and reaching Safaricom
+DEFAULT_EXPIRES_IN = 3599
+REFRESH_MARGIN = int(os.getenv("MPESA_TOKEN_REFRESH_MARGIN", 60))
 
-def get_access_token():
+
+class MpesaAuthError(RuntimeError):
+    """Raised when Daraja does not hand out an access token."""
+
+
+def request_access_token():
+    """Fetch a fresh token from the Daraja OAuth endpoint: (token, expires_in)"""
     consumer_key = os.getenv("MPESA_CONSUMER_KEY")
     consumer_secret = os.getenv("MPESA_CONSUMER_SECRET")
-    base_url = os.getenv("MPESA_BASE_URL")
 
-    url = f"{base_url}/oauth/v1/generate?grant_type=client_credentials"
-    res = requests.get(url, auth=HTTPBasicAuth(consumer_key, consumer_secret))
+    res = mpesa_client.get(
+        "/oauth/v1/generate?grant_type=client_credentials", "oauth",
+        auth=HTTPBasicAuth(consumer_key, consumer_secret)
+    )
+
+    data = res.json() if res.content else {}
+    access_token = data.get('access_token')
+    if not access_token:
+        raise MpesaAuthError(f"OAuth request failed with status {res.status_code}")
+    try:
+        expires_in = int(data.get('expires_in', DEFAULT_EXPIRES_IN))
+    except (TypeError, ValueError):
+        expires_in = DEFAULT_EXPIRES_IN
+    return access_token, expires_in
+
+
+class AccessTokenCache:
+    """
+    Thread-safe cache for the OAuth access token.
+
+    Callers get the cached token until `refresh_margin` seconds before it
+    expires. Inside that window one caller refreshes while the rest keep
+    using the still-valid token; once it has expired, concurrent callers
+    wait on the same lock so only one request goes upstream. With a shared
+    `store`, a process about to refresh first adopts a token another
+    worker already fetched.
+    """
+
+    def __init__(self, fetch=request_access_token, refresh_margin=REFRESH_MARGIN, clock=time.monotonic,
+                 store=None, wall_clock=time.time):
+        self._fetch = fetch
+        self._refresh_margin = refresh_margin
+        self._clock = clock
+        self._store = store
+        self._wall_clock = wall_clock
+        self._lock = threading.Lock()
+        self._token = None
+        self._expires_at = 0.0
 
-    access_token = res.json().get('access_token')
-    return access_token
+    def get(self):
+        token, expires_at = self._token, self._expires_at
+        now = self._clock()
+        if token and now < expires_at - self._refresh_margin:
+            return token
+
+        if token and now < expires_at:
+            # Still valid: refresh only if nobody else already is
+            if not self._lock.acquire(blocking=False):
+                return token
+        else:
+            self._lock.acquire()
+
+        try:
+            if self._token is not token and self._clock() < self._expires_at - self._refresh_margin:
+                return self._token
+            if self._adopt_shared():
+                return self._token
+            try:
+                new_token, expires_in = self._fetch()
+            except Exception:
+                if token and self._clock() < expires_at:
+                    return token
+                raise
+            self._token = new_token
+            self._expires_at = self._clock() + expires_in
+            if self._store is not None:
+                self._store.set('token', {'token': new_token, 'expires_at': self._wall_clock() + expires_in},
+                                ttl=expires_in)
+            return new_token
+        finally:
+            self._lock.release()
+
+    def _adopt_shared(self):
+        # Stored expiry is wall-clock time, since monotonic clocks differ per process
+        entry = self._store.get('token') if self._store is not None else None
+        if not entry:
+            return False
+        remaining = entry['expires_at'] - self._wall_clock()
+        if remaining <= self._refresh_margin or entry['token'] == self._token:
+            return False
+        self._token = entry['token']
+        self._expires_at = self._clock() + remaining
+        return True
+
+    def invalidate(self, token=None):
+        """Drop the cached token (only if it is still `token`, when given)"""
+        with self._lock:
+            if token is None or self._token == token:
+                self._token = None
+                self._expires_at = 0.0
+            if self._store is not None:
+                entry = self._store.get('token')
+                if entry and (token is None or entry['token'] == token):
+                    self._store.delete('token')
+
+
+token_cache = AccessTokenCache(store=mpesa_token_store)
+
+
+def get_access_token():
+    return token_cache.get()
@@ -0,0 +1,104 @@
+import os
+import threading
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+import config  # noqa: F401 (loads .env before the settings below are read)
+
+
+class MpesaClient:
+    """
+    Shared HTTP client for the Daraja API.
+
+    One pooled keep-alive `requests.Session` per process, with connect/read
+    timeouts on every call. Retries with exponential backoff cover failed
+    connects (the request never left) and, for GET only, read errors and
+    429/5xx responses, so a non-idempotent call such as an STK push is never
+    delivered twice. Each call's latency is recorded per endpoint for
+    /admin/metrics.
+    """
+
+    def __init__(self, connect_timeout=None, read_timeout=None, max_retries=None, backoff=None, pool_size=None):
+        self.timeout = (
+            float(connect_timeout or os.getenv("MPESA_CONNECT_TIMEOUT", 3.05)),
+            float(read_timeout or os.getenv("MPESA_READ_TIMEOUT", 15))
+        )
+        self.max_retries = int(max_retries if max_retries is not None else os.getenv("MPESA_MAX_RETRIES", 2))
+        self.backoff = float(backoff if backoff is not None else os.getenv("MPESA_RETRY_BACKOFF", 0.5))
+        self.pool_size = int(pool_size or os.getenv("MPESA_POOL_SIZE", 10))
+        self._session = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self._metrics = {}
+
+    @property
+    def session(self):
+        # Built lazily and rebuilt after a fork so workers never share sockets
+        if self._session is None or self._pid != os.getpid():
+            with self._lock:
+                if self._session is None or self._pid != os.getpid():
+                    self._session = self._build_session()
+                    self._pid = os.getpid()
+        return self._session
+
+    def _build_session(self):
+        retry = Retry(
+            total=self.max_retries,
+            connect=self.max_retries,
+            read=self.max_retries,
+            status=self.max_retries,
+            backoff_factor=self.backoff,
+            status_forcelist=(429, 500, 502, 503, 504),
+            allowed_methods=frozenset({"GET"}),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self.pool_size, max_retries=retry)
+        session = requests.Session()
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def request(self, method, path, endpoint, **kwargs):
+        kwargs.setdefault("timeout", self.timeout)
+        url = f"{os.getenv('MPESA_BASE_URL')}{path}"
+        start = time.perf_counter()
+        failed = True
+        try:
+            response = self.session.request(method, url, **kwargs)
+            failed = response.status_code >= 500
+            return response
+        finally:
+            self._record(endpoint, time.perf_counter() - start, failed)
+
+    def get(self, path, endpoint, **kwargs):
+        return self.request("GET", path, endpoint, **kwargs)
+
+    def post(self, path, endpoint, **kwargs):
+        return self.request("POST", path, endpoint, **kwargs)
+
+    def _record(self, endpoint, seconds, failed):
+        ms = seconds * 1000
+        with self._lock:
+            m = self._metrics.setdefault(endpoint, {"calls": 0, "errors": 0, "total_ms": 0.0, "max_ms": 0.0})
+            m["calls"] += 1
+            m["errors"] += int(failed)
+            m["total_ms"] += ms
+            m["max_ms"] = max(m["max_ms"], ms)
+            m["last_ms"] = ms
+
+    def stats(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    **m,
+                    "total_ms": round(m["total_ms"], 1),
+                    "max_ms": round(m["max_ms"], 1),
+                    "last_ms": round(m["last_ms"], 1),
+                    "avg_ms": round(m["total_ms"] / m["calls"], 1)
+                }
+                for endpoint, m in self._metrics.items()
+            }
+
+
+mpesa_client = MpesaClient()
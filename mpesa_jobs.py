@@ -0,0 +1,57 @@
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+
+class StkPushQueue:
+    """
+    Background pool that sends STK pushes off the request thread.
+
+    The async endpoint records a pending Transaction and enqueues its id;
+    a worker thread sends the push inside an app context and stores the
+    CheckoutRequestID (or marks the transaction failed). Clients poll
+    /api/transactions/<id>. Jobs live in memory, so a transaction whose
+    worker process died before sending stays pending without a
+    checkout_request_id.
+    """
+
+    def __init__(self, max_workers=4):
+        self.max_workers = max_workers
+        self._app = None
+        self._executor = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+    def init_app(self, app):
+        self._app = app
+        self.max_workers = app.config.get('MPESA_ASYNC_WORKERS', self.max_workers)
+
+    @property
+    def executor(self):
+        # Created lazily and per process: threads don't survive a fork
+        if self._executor is None or self._pid != os.getpid():
+            with self._lock:
+                if self._executor is None or self._pid != os.getpid():
+                    self._executor = ThreadPoolExecutor(
+                        max_workers=self.max_workers, thread_name_prefix='stk-push'
+                    )
+                    self._pid = os.getpid()
+        return self._executor
+
+    def enqueue(self, transaction_id):
+        return self.executor.submit(self._run, transaction_id)
+
+    def _run(self, transaction_id):
+        from mpesa_stk import process_stk_push
+
+        with self._app.app_context():
+            try:
+                process_stk_push(transaction_id)
+            except Exception:
+                logger.exception("STK push job for transaction %s failed", transaction_id)
+
+
+stk_push_queue = StkPushQueue()
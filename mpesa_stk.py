@@ -1,21 +1,20 @@
 
 import os
-import requests
 from datetime import datetime
-from dotenv import load_dotenv
 from base64 import b64encode
-from mpesa_auth import get_access_token
+from mpesa_auth import get_access_token, token_cache
+from mpesa_client import mpesa_client
 from models import db, Transaction
 
-load_dotenv()
 
-def lipa_na_mpesa(phone, amount, user_id):
-    access_token = get_access_token()
-    headers = {
+def _headers(access_token):
+    return {
         "Authorization": f"Bearer {access_token}",
         "Content-Type": "application/json"
     }
 
+def send_stk_push(phone, amount, user_id):
+    """Ask Daraja to prompt `phone` for payment; returns the requests response"""
     timestamp = datetime.now().strftime("%Y%m%d%H%M%S")
     shortcode = os.getenv("MPESA_SHORTCODE")
     passkey = os.getenv("MPESA_PASSKEY")
@@ -39,9 +38,18 @@ def lipa_na_mpesa(phone, amount, user_id):
         "TransactionDesc": "Energy Payment"
     }
 
-    url = f"{os.getenv('MPESA_BASE_URL')}/mpesa/stkpush/v1/processrequest"
-    response = requests.post(url, json=payload, headers=headers)
-    
+    path = "/mpesa/stkpush/v1/processrequest"
+    access_token = get_access_token()
+    response = mpesa_client.post(path, "stkpush", json=payload, headers=_headers(access_token))
+    if response.status_code == 401:
+        # Token revoked before its expiry: the push was rejected, so retry once
+        token_cache.invalidate(access_token)
+        response = mpesa_client.post(path, "stkpush", json=payload, headers=_headers(get_access_token()))
+    return response
+
+def lipa_na_mpesa(phone, amount, user_id):
+    response = send_stk_push(phone, amount, user_id)
+
     # Create a transaction record
     if response.status_code == 200:
         response_data = response.json()
@@ -58,3 +66,23 @@ def lipa_na_mpesa(phone, amount, user_id):
             db.session.commit()
     
     return response.json()
+
+def process_stk_push(transaction_id):
+    """Send the push for a pending Transaction recorded by the async endpoint"""
+    transaction = Transaction.query.get(transaction_id)
+    if not transaction or transaction.checkout_request_id or transaction.status != 'pending':
+        return
+
+    try:
+        response = send_stk_push(transaction.phone, transaction.amount, transaction.user_id)
+        response_data = response.json()
+    except Exception as e:
+        response_data = {'errorMessage': str(e)}
+
+    if 'CheckoutRequestID' in response_data:
+        transaction.checkout_request_id = response_data['CheckoutRequestID']
+        transaction.merchant_request_id = response_data.get('MerchantRequestID')
+    else:
+        transaction.status = 'failed'
+        transaction.result_desc = str(response_data.get('errorMessage', 'STK push rejected'))[:255]
+    db.session.commit()
@@ -0,0 +1,139 @@
+import base64
+import json
+from datetime import date, datetime
+from sqlalchemy import and_, or_
+
+DEFAULT_LIMIT = 20
+MAX_LIMIT = 100
+
+
+class CursorError(ValueError):
+    """Raised when a client sends a malformed cursor or limit."""
+
+
+def parse_limit(raw, default=DEFAULT_LIMIT, maximum=MAX_LIMIT):
+    """Parse the `limit` query parameter, clamped to `maximum`."""
+    if raw is None or raw == '':
+        return default
+    try:
+        limit = int(raw)
+    except (TypeError, ValueError):
+        raise CursorError('limit must be an integer')
+    if limit < 1:
+        raise CursorError('limit must be positive')
+    return min(limit, maximum)
+
+
+def parse_bool(args, name):
+    """Query parameter `name` as True/False (true/1, false/0), or None when absent."""
+    raw = args.get(name)
+    if raw is None or raw == '':
+        return None
+    if raw.lower() in ('true', '1'):
+        return True
+    if raw.lower() in ('false', '0'):
+        return False
+    raise ValueError(f'{name} must be true or false')
+
+
+def parse_number(args, name, cast=int):
+    """Query parameter `name` converted with `cast`, or None when absent."""
+    raw = args.get(name)
+    if raw is None or raw == '':
+        return None
+    try:
+        return cast(raw)
+    except ValueError:
+        raise ValueError(f"{name} must be {'an integer' if cast is int else 'a number'}")
+
+
+def parse_date(args, name):
+    """Query parameter `name` as an ISO date, or None when absent."""
+    raw = args.get(name)
+    if raw is None or raw == '':
+        return None
+    try:
+        return date.fromisoformat(raw)
+    except ValueError:
+        raise ValueError(f'{name} must be a date (YYYY-MM-DD)')
+
+
+def _dump(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _load(value):
+    if isinstance(value, (str, int, float)):
+        return value
+    if isinstance(value, dict) and list(value) == ['dt'] and isinstance(value['dt'], str):
+        try:
+            return datetime.fromisoformat(value['dt'])
+        except ValueError:
+            pass
+    raise CursorError('Invalid cursor')
+
+
+def encode_cursor(values):
+    """Encode the sort key of the last row of a page into an opaque token."""
+    raw = json.dumps([_dump(v) for v in values], separators=(',', ':'))
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(token, size):
+    """Decode a token produced by `encode_cursor` into `size` key values."""
+    try:
+        padded = token + '=' * (-len(token) % 4)
+        values = json.loads(base64.urlsafe_b64decode(padded.encode()))
+    except (ValueError, TypeError):
+        raise CursorError('Invalid cursor')
+    if not isinstance(values, list) or len(values) != size:
+        raise CursorError('Invalid cursor')
+    return [_load(v) for v in values]
+
+
+def _fits(key, value):
+    """Whether a decoded cursor value can be compared with column `key`."""
+    try:
+        expected = key.type.python_type
+    except NotImplementedError:
+        return True
+    if expected is float:
+        expected = (int, float)
+    return isinstance(value, expected) and not (isinstance(value, bool) and expected is not bool)
+
+
+def keyset_page(query, keys, cursor=None, limit=DEFAULT_LIMIT, descending=False):
+    """
+    Return one page of `query` ordered by `keys` and the cursor for the next one.
+
+    `keys` are column expressions; the last one must be unique (normally the
+    primary key) so the ordering is total. Rows after the cursor are selected
+    with a row-value comparison expanded into OR/AND terms, which any index
+    leading with the same columns can serve without an OFFSET scan.
+    """
+    if cursor:
+        values = decode_cursor(cursor, len(keys))
+        if not all(_fits(key, value) for key, value in zip(keys, values)):
+            raise CursorError('Invalid cursor')
+        terms = []
+        for i, key in enumerate(keys):
+            equal = [keys[j] == values[j] for j in range(i)]
+            beyond = key < values[i] if descending else key > values[i]
+            terms.append(and_(*equal, beyond))
+        query = query.filter(or_(*terms))
+
+    order = [key.desc() if descending else key.asc() for key in keys]
+    width = len(query.column_descriptions)
+    # Labelled so they are not merged with the same columns already selected
+    labelled = [key.label(f'keyset_{i}') for i, key in enumerate(keys)]
+    rows = query.add_columns(*labelled).order_by(*order).limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(list(rows[-1][width:]))
+    # Entity queries give back the objects; column queries their rows,
+    # which keep named access to the selected columns
+    return [row[0] if width == 1 else row for row in rows], next_cursor
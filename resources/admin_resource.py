@@ -1,37 +1,109 @@
 from flask_restful import Resource
-from flask_jwt_extended import jwt_required, get_jwt_identity
-from flask import request
-from models import db, User, Product, Order, SupportTicket, Category
+from flask_jwt_extended import get_jwt_identity
+from flask import request, current_app
+from models import db, User, Product, Order, SupportTicket, Category, product_load_options
+from analytics import read_counters
+from cache import admin_counts, catalog_cache
+from db_pool import pool_stats
+from dashboard import dashboard_counters, read_dashboard_snapshot
+from export import export_response
+from decorators import admin_required, remember_role
+from mpesa_client import mpesa_client
+from pagination import keyset_page, parse_bool, parse_limit, parse_number
+from serializers import order_to_dict, product_to_dict, ticket_to_dict, user_to_dict
 from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+
+
+def _total(name, filters, counter, query):
+    """
+    Row count for a filtered admin list: the analytics counter when one
+    matches the filters exactly, otherwise a COUNT(*) reused for a minute
+    """
+    if counter is not None:
+        return int(read_counters(counter).get(counter, 0))
+    key = (name, tuple(sorted(filters.items())))
+    total = admin_counts.get(key)
+    if total is None:
+        total = query.order_by(None).with_entities(func.count()).scalar()
+        admin_counts.set(key, total)
+    return total
+
+
+def _list_page(query, id_column, serialize, descending, total):
+    """
+    One keyset page of an admin list, ordered by id (?order=asc|desc).
+    ?count=true adds the `total()` of rows matching the filters.
+    """
+    args = request.args
+    order = args.get('order')
+    if order:
+        if order not in ('asc', 'desc'):
+            raise ValueError('order must be asc or desc')
+        descending = order == 'desc'
+    limit = parse_limit(args.get('limit'))
+    with_count = parse_bool(args, 'count')
+
+    rows, next_cursor = keyset_page(query, [id_column], args.get('cursor'), limit, descending)
+    body = {
+        'items': [serialize(row) for row in rows],
+        'next_cursor': next_cursor,
+        'limit': limit
+    }
+    if with_count:
+        body['total'] = total()
+    return body, 200
+
 
 class AdminUserResource(Resource):
-    @jwt_required()
+    @admin_required
     def get(self, user_id=None):
-        """Get all users or a specific user (admin only)"""
-        # Check if user is admin
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or current_user.role != 'admin':
-            return {'message': 'Unauthorized'}, 403
-
+        """Get a specific user, or users one keyset page at a time, filtered by
+        ?role=, ?is_approved= and ?q= (email prefix) (admin only).
+        ?all=true returns every user; ?format=ndjson|csv streams them"""
         # If user_id is provided, get specific user
         if user_id is not None:
             user = User.query.get_or_404(user_id)
-            return user.to_dict(), 200
-        else:
+            return user_to_dict(user), 200
+        elif request.args.get('format'):
+            return export_response(request.args['format'], User.query.order_by(User.id), user_to_dict, 'users')
+        elif request.args.get('all', '').lower() == 'true':
             # Get all users
             users = User.query.all()
-            return [user.to_dict() for user in users], 200
-
-    @jwt_required()
+            return [user_to_dict(user) for user in users], 200
+
+        try:
+            filters = {
+                'role': request.args.get('role') or None,
+                'is_approved': parse_bool(request.args, 'is_approved'),
+                'q': (request.args.get('q') or '').strip().lower() or None
+            }
+            query = User.query
+            if filters['role']:
+                query = query.filter(User.role == filters['role'])
+            if filters['is_approved'] is not None:
+                query = query.filter(User.is_approved == filters['is_approved'])
+            if filters['q']:
+                # Emails are stored lowercased; a range keeps the prefix
+                # match on the unique email index
+                query = query.filter(User.email >= filters['q'], User.email < filters['q'] + '\uffff')
+
+            counter = None
+            if not filters['q']:
+                if filters['role'] and filters['is_approved'] is None:
+                    counter = f"users.role:{filters['role']}"
+                elif filters['is_approved'] is not None and not filters['role']:
+                    counter = f"users.approved:{str(filters['is_approved']).lower()}"
+                elif not filters['role']:
+                    counter = 'users.total'
+            return _list_page(query, User.id, user_to_dict, False,
+                              lambda: _total('users', filters, counter, query))
+        except ValueError as e:
+            return {'message': str(e)}, 400
+
+    @admin_required
     def post(self):
         """Create a new user (admin only)"""
-        # Check if user is admin
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or current_user.role != 'admin':
-            return {'message': 'Unauthorized'}, 403
-
         data = request.get_json()
         required_fields = ['first_name', 'last_name', 'email', 'password']
         for field in required_fields:
@@ -55,17 +127,11 @@ class AdminUserResource(Resource):
         db.session.add(new_user)
         db.session.commit()
         
-        return new_user.to_dict(), 201
+        return user_to_dict(new_user), 201
 
-    @jwt_required()
+    @admin_required
     def patch(self, user_id):
         """Update user role or approval status (admin only)"""
-        # Check if user is admin
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or current_user.role != 'admin':
-            return {'message': 'Unauthorized'}, 403
-
         user = User.query.get_or_404(user_id)
         data = request.get_json()
 
@@ -75,51 +141,54 @@ class AdminUserResource(Resource):
             user.is_approved = data['is_approved']
 
         db.session.commit()
-        return user.to_dict(), 200
+        remember_role(user.id, user.role, user.is_approved)
+        return user_to_dict(user), 200
 
-    @jwt_required()
+    @admin_required
     def delete(self, user_id):
         """Delete a user (admin only)"""
-        # Check if user is admin
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or current_user.role != 'admin':
-            return {'message': 'Unauthorized'}, 403
-
         user = User.query.get_or_404(user_id)
         db.session.delete(user)
         db.session.commit()
+        remember_role(user_id, None, False)
+        # The user's products are deleted with them
+        catalog_cache.invalidate()
         return {'message': 'User deleted'}, 200
 
 
 class AdminProductResource(Resource):
-    @jwt_required()
+    @admin_required
     def get(self, product_id=None):
-        """Get all products or a specific product (admin only)"""
-        # Check if user is admin
-        current_user_id = get_jwt_identity()
-        current_user = User.query.get(current_user_id)
-        if not current_user or current_user.role != 'admin':
-            return {'message': 'Unauthorized'}, 403
-
+        """Get a specific product, or products one keyset page at a time (admin only).
+        ?all=true returns every product; ?format=ndjson|csv streams them"""
         # If product_id is provided, get specific product
         if product_id is not None:
-            product = Product.query.get_or_404(product_id)
-            return product.to_dict(), 200
-        else:
+            payload = catalog_cache.get_product(product_id)
+            if payload is None:
+                generation = catalog_cache.generation
+                product = Product.query.options(*product_load_options()).get_or_404(product_id)
+                payload = product_to_dict(product)
+                catalog_cache.set_product(product_id, payload, generation)
+            return payload, 200
+        elif request.args.get('format'):
+            query = Product.query.options(*product_load_options()).order_by(Product.id)
+            return export_response(request.args['format'], query, product_to_dict, 'products')
+        elif request.args.get('all', '').lower() == 'true':
             # Get all products
-            products = Product.query.all()
-            return [product.to_dict() for product in products], 200
+            products = Product.query.options(*product_load_options()).all()
+            return [product_to_dict(product) for product in products], 200
+
+        try:
+            query = Product.query.options(*product_load_options())
+            return _list_page(query, Product.id, product_to_dict, False,
+                              lambda: _total('products', {}, 'products.total', query))
+        except ValueError as e:
+            return {'message': str(e)}, 400
 
-    @jwt_required()
+    @admin_required
     def post(self):
         """Create a new product (admin only)"""
-        # Check if user is admin
         user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        if not current_user or current_user.role != 'admin':
-            return {'message': 'Unauthorized'}, 403
-
         data = request.get_json()
         required_fields = ['name', 'description', 'price', 'category_id']
         for field in required_fields:
@@ -144,17 +213,12 @@ class AdminProductResource(Resource):
 
         db.session.add(product)
         db.session.commit()
-        return product.to_dict(), 201
+        catalog_cache.invalidate()
+        return product_to_dict(product), 201
 
-    @jwt_required()
+    @admin_required
     def patch(self, product_id):
         """Update a product (admin only)"""
-        # Check if user is admin
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        if not current_user or current_user.role != 'admin':
-            return {'message': 'Unauthorized'}, 403
-
         product = Product.query.get_or_404(product_id)
         data = request.get_json()
 
@@ -168,51 +232,59 @@ class AdminProductResource(Resource):
                 setattr(product, field, data[field])
 
         db.session.commit()
-        return product.to_dict(), 200
+        catalog_cache.invalidate()
+        return product_to_dict(product), 200
 
-    @jwt_required()
+    @admin_required
     def delete(self, product_id):
         """Delete a product (admin only)"""
-        # Check if user is admin
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        if not current_user or current_user.role != 'admin':
-            return {'message': 'Unauthorized'}, 403
-
         product = Product.query.get_or_404(product_id)
         db.session.delete(product)
         db.session.commit()
+        catalog_cache.invalidate()
         return {'message': 'Product deleted'}, 200
 
 
 class AdminOrderResource(Resource):
-    @jwt_required()
+    @admin_required
     def get(self, order_id=None):
-        """Get all orders or a specific order (admin only)"""
-        # Check if user is admin
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        if not current_user or current_user.role != 'admin':
-            return {'message': 'Unauthorized'}, 403
-
+        """Get a specific order, or orders newest first one keyset page at a time,
+        filtered by ?status= and ?customer_id= (admin only).
+        ?all=true returns every order; ?format=ndjson|csv streams them"""
         # If order_id is provided, get specific order
         if order_id is not None:
             order = Order.query.get_or_404(order_id)
-            return order.to_dict(), 200
-        else:
+            return order_to_dict(order), 200
+        elif request.args.get('format'):
+            query = Order.query.options(selectinload(Order.items)).order_by(Order.id)
+            return export_response(request.args['format'], query, order_to_dict, 'orders')
+        elif request.args.get('all', '').lower() == 'true':
             # Get all orders
             orders = Order.query.all()
-            return [order.to_dict() for order in orders], 200
-
-    @jwt_required()
+            return [order_to_dict(order) for order in orders], 200
+
+        try:
+            filters = {
+                'status': request.args.get('status') or None,
+                'customer_id': parse_number(request.args, 'customer_id')
+            }
+            query = Order.query.options(selectinload(Order.items))
+            if filters['status']:
+                query = query.filter(Order.status == filters['status'])
+            if filters['customer_id'] is not None:
+                query = query.filter(Order.customer_id == filters['customer_id'])
+
+            counter = None
+            if filters['customer_id'] is None:
+                counter = f"orders.status:{filters['status']}" if filters['status'] else 'orders.total'
+            return _list_page(query, Order.id, order_to_dict, True,
+                              lambda: _total('orders', filters, counter, query))
+        except ValueError as e:
+            return {'message': str(e)}, 400
+
+    @admin_required
     def patch(self, order_id):
         """Update order status (admin only)"""
-        # Check if user is admin
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        if not current_user or current_user.role != 'admin':
-            return {'message': 'Unauthorized'}, 403
-
         order = Order.query.get_or_404(order_id)
         data = request.get_json()
 
@@ -220,37 +292,41 @@ class AdminOrderResource(Resource):
             order.status = data['status']
 
         db.session.commit()
-        return order.to_dict(), 200
+        return order_to_dict(order), 200
 
 
 class AdminTicketResource(Resource):
-    @jwt_required()
+    @admin_required
     def get(self, ticket_id=None):
-        """Get all support tickets or a specific ticket (admin only)"""
-        # Check if user is admin
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        if not current_user or current_user.role != 'admin':
-            return {'message': 'Unauthorized'}, 403
-
+        """Get a specific ticket, or tickets newest first one keyset page at a time,
+        filtered by ?status= (admin only).
+        ?all=true returns every ticket; ?format=ndjson|csv streams them"""
         # If ticket_id is provided, get specific ticket
         if ticket_id is not None:
             ticket = SupportTicket.query.get_or_404(ticket_id)
-            return ticket.to_dict(), 200
-        else:
+            return ticket_to_dict(ticket), 200
+        elif request.args.get('format'):
+            query = SupportTicket.query.order_by(SupportTicket.id)
+            return export_response(request.args['format'], query, ticket_to_dict, 'tickets')
+        elif request.args.get('all', '').lower() == 'true':
             # Get all tickets
             tickets = SupportTicket.query.all()
-            return [ticket.to_dict() for ticket in tickets], 200
-
-    @jwt_required()
+            return [ticket_to_dict(ticket) for ticket in tickets], 200
+
+        try:
+            status = request.args.get('status') or None
+            query = SupportTicket.query
+            if status:
+                query = query.filter(SupportTicket.status == status)
+            counter = f'tickets.status:{status}' if status else 'tickets.total'
+            return _list_page(query, SupportTicket.id, ticket_to_dict, True,
+                              lambda: _total('tickets', {'status': status}, counter, query))
+        except ValueError as e:
+            return {'message': str(e)}, 400
+
+    @admin_required
     def patch(self, ticket_id):
         """Respond to a support ticket (admin only)"""
-        # Check if user is admin
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        if not current_user or current_user.role != 'admin':
-            return {'message': 'Unauthorized'}, 403
-
         ticket = SupportTicket.query.get_or_404(ticket_id)
         data = request.get_json()
 
@@ -259,42 +335,34 @@ class AdminTicketResource(Resource):
             ticket.status = data.get('status', 'closed')
 
         db.session.commit()
-        return ticket.to_dict(), 200
+        return ticket_to_dict(ticket), 200
 
 
 class AdminDashboardResource(Resource):
-    @jwt_required()
+    @admin_required
     def get(self):
-        """Get admin dashboard statistics"""
-        # Check if user is admin
-        user_id = get_jwt_identity()
-        current_user = User.query.get(user_id)
-        if not current_user or current_user.role != 'admin':
-            return {'message': 'Unauthorized'}, 403
-
-        # Get statistics
-        total_users = User.query.count()
-        total_products = Product.query.count()
-        total_orders = Order.query.count()
-        total_tickets = SupportTicket.query.count()
-        
+        """Get admin dashboard statistics (?source=snapshot reads the precomputed row)"""
+        if request.args.get('source') == 'snapshot':
+            stats = read_dashboard_snapshot(current_app.config['DASHBOARD_SNAPSHOT_MAX_AGE'])
+        else:
+            stats = dashboard_counters()
+
         # Get recent orders
-        recent_orders = Order.query.order_by(Order.created_at.desc()).limit(5).all()
-        
-        # Get pending tickets
-        pending_tickets = SupportTicket.query.filter_by(status='open').count()
-        
-        # Get sales data (sum of all order items)
-        total_revenue = db.session.query(
-            func.sum(OrderItem.total_price)
-        ).scalar() or 0
+        recent_orders = Order.query.options(selectinload(Order.items)) \
+            .order_by(Order.created_at.desc()).limit(5).all()
 
         return {
-            'total_users': total_users,
-            'total_products': total_products,
-            'total_orders': total_orders,
-            'total_tickets': total_tickets,
-            'pending_tickets': pending_tickets,
-            'total_revenue': float(total_revenue) if total_revenue else 0,
-            'recent_orders': [order.to_dict() for order in recent_orders]
+            **stats,
+            'recent_orders': [order_to_dict(order) for order in recent_orders]
+        }, 200
+
+
+class AdminMetricsResource(Resource):
+    @admin_required
+    def get(self):
+        """Get in-process cache, connection pool and M-Pesa counters (admin only)"""
+        return {
+            'catalog_cache': catalog_cache.stats(),
+            'db_pool': pool_stats(db.engine),
+            'mpesa': mpesa_client.stats()
         }, 200
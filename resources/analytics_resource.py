@@ -1,84 +1,102 @@
+from datetime import date, timedelta
+from flask import request
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required
-from models import User, SupportTicket, Product, Order, OrderItem
-from sqlalchemy import func
-from models import db
+from analytics import read_counters, grouped, parse_flag
+from decorators import admin_required
+from rollups import PERIODS, ALL, read_sales, read_breakdown
+from pagination import parse_date, parse_number
+
+# Range returned when the request has no ?start=
+DEFAULT_SPAN = {'day': timedelta(days=29), 'week': timedelta(weeks=11), 'month': timedelta(days=365)}
 
 class UserAnalyticsResource(Resource):
     @jwt_required()
     def get(self):
         """Get user analytics"""
-        # Get total users count
-        total_users = User.query.count()
-        
-        # Get users by role
-        users_by_role = db.session.query(
-            User.role, 
-            func.count(User.id).label('count')
-        ).group_by(User.role).all()
-        
-        # Get users by approval status
-        users_by_approval = db.session.query(
-            User.is_approved, 
-            func.count(User.id).label('count')
-        ).group_by(User.is_approved).all()
-        
+        counters = read_counters('users.')
+
         return {
-            'total_users': total_users,
-            'users_by_role': [{'role': role, 'count': count} for role, count in users_by_role],
-            'users_by_approval': [{'approved': approved, 'count': count} for approved, count in users_by_approval]
+            'total_users': int(counters.get('users.total', 0)),
+            'users_by_role': [{'role': role, 'count': count} for role, count in grouped(counters, 'users.role:')],
+            'users_by_approval': [{'approved': approved, 'count': count} for approved, count in grouped(counters, 'users.approved:', parse_flag)]
         }, 200
 
 class TicketStatusAnalyticsResource(Resource):
     @jwt_required()
     def get(self):
         """Get ticket status analytics"""
-        # Get tickets by status
-        tickets_by_status = db.session.query(
-            SupportTicket.status, 
-            func.count(SupportTicket.id).label('count')
-        ).group_by(SupportTicket.status).all()
-        
-        # Get total tickets
-        total_tickets = SupportTicket.query.count()
-        
+        counters = read_counters('tickets.')
+
         return {
-            'total_tickets': total_tickets,
-            'tickets_by_status': [{'status': status, 'count': count} for status, count in tickets_by_status]
+            'total_tickets': int(counters.get('tickets.total', 0)),
+            'tickets_by_status': [{'status': status, 'count': count} for status, count in grouped(counters, 'tickets.status:')]
         }, 200
 
 class ProductStatusAnalyticsResource(Resource):
     @jwt_required()
     def get(self):
         """Get product status analytics"""
-        # Get total products
-        total_products = Product.query.count()
-        
-        # Get products by category
-        products_by_category = db.session.query(
-            Product.category_id,
-            func.count(Product.id).label('count')
-        ).group_by(Product.category_id).all()
-        
-        # Get products by popularity
-        popular_products = Product.query.filter_by(is_popular=True).count()
-        
-        # Get products with low stock (less than 5)
-        low_stock_products = Product.query.filter(Product.stock < 5).count()
-        
-        # Get total orders
-        total_orders = Order.query.count()
-        
-        # Get total revenue (sum of all order items)
-        total_revenue = db.session.query(
-            func.sum(OrderItem.total_price)
-        ).scalar() or 0
-        
+        counters = read_counters('products.', 'orders.', 'order_items.')
+
         return {
-            'total_products': total_products,
-            'total_categories': len(products_by_category),
-            'popular_products': popular_products,
-            'low_stock_products': low_stock_products,
-            'total_orders': total_orders,
-            'total_revenue': float(total_revenue) if total_revenue else 0
+            'total_products': int(counters.get('products.total', 0)),
+            'total_categories': len(grouped(counters, 'products.category:')),
+            'popular_products': int(counters.get('products.popular', 0)),
+            'low_stock_products': int(counters.get('products.low_stock', 0)),
+            'total_orders': int(counters.get('orders.total', 0)),
+            'total_revenue': float(counters.get('order_items.revenue', 0))
         }, 200
+
+
+class SalesAnalyticsResource(Resource):
+    @admin_required
+    def get(self):
+        """Revenue, orders and units per day/week/month, read from the sales rollups"""
+        args = request.args
+        period = args.get('period', 'day')
+        breakdown = args.get('breakdown')
+        if period not in PERIODS:
+            return {'message': f"period must be one of {', '.join(PERIODS)}"}, 400
+        if breakdown not in (None, 'category', 'product'):
+            return {'message': 'breakdown must be category or product'}, 400
+
+        try:
+            end = parse_date(args, 'end') or date.today()
+            start = parse_date(args, 'start') or end - DEFAULT_SPAN[period]
+            category_id = parse_number(args, 'category_id') or ALL
+            product_id = parse_number(args, 'product_id') or ALL
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        if start > end:
+            return {'message': 'start must not be after end'}, 400
+        if category_id != ALL and product_id != ALL:
+            return {'message': 'Filter by category_id or product_id, not both'}, 400
+
+        result = {
+            'period': period,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'category_id': category_id or None,
+            'product_id': product_id or None
+        }
+        if breakdown:
+            result['breakdown'] = [
+                {f'{breakdown}_id': scope_id, 'revenue': round(revenue, 2), 'orders': orders, 'units': units}
+                for scope_id, revenue, orders, units in read_breakdown(period, start, end, breakdown)
+                if orders or units
+            ]
+            return result, 200
+
+        buckets = [
+            {'bucket': bucket.isoformat(), 'revenue': round(revenue, 2), 'orders': orders, 'units': units}
+            for bucket, revenue, orders, units in read_sales(period, start, end, category_id, product_id)
+            if orders or units or revenue
+        ]
+        result['buckets'] = buckets
+        result['totals'] = {
+            'revenue': round(sum(b['revenue'] for b in buckets), 2),
+            'orders': sum(b['orders'] for b in buckets),
+            'units': sum(b['units'] for b in buckets)
+        }
+        return result, 200
@@ -2,6 +2,8 @@ from flask import request
 from flask_restful import Resource
 from flask_jwt_extended import create_access_token
 from models import User, db
+from serializers import user_to_dict
+from decorators import role_claims
 from flask_bcrypt import Bcrypt
 import re
 
@@ -29,7 +31,7 @@ class AuthResource(Resource):
             if not user or not user.verify_password(password):
                 return {"error": "Invalid email or password"}, 401
 
-            token = create_access_token(identity=user.id)
+            token = create_access_token(identity=user.id, additional_claims=role_claims(user))
 
             # Determine role-based redirect URL
             if user.role == "admin":
@@ -40,7 +42,7 @@ class AuthResource(Resource):
                 redirect_url = "/customer/dashboard"
 
             return {
-                "user": user.to_dict(),
+                "user": user_to_dict(user),
                 "access_token": token,
                 "redirect_url": redirect_url
             }, 200
@@ -68,10 +70,10 @@ class AuthResource(Resource):
             db.session.add(new_user)
             db.session.commit()
 
-            token = create_access_token(identity=new_user.id)
+            token = create_access_token(identity=new_user.id, additional_claims=role_claims(new_user))
 
             return {
-                "user": new_user.to_dict(),
+                "user": user_to_dict(new_user),
                 "access_token": token,
                 "redirect_url": "/customer/dashboard"
             }, 201
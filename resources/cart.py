@@ -1,14 +1,16 @@
 from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask import request
+from sqlalchemy.exc import IntegrityError
 from models import db, CartItem, Product
+from serializers import cart_item_to_dict
 
 class CartResource(Resource):
     @jwt_required()
     def get(self):
         user_id = get_jwt_identity()
         items = CartItem.query.filter_by(user_id=user_id).all()
-        return [item.to_dict() for item in items], 200
+        return [cart_item_to_dict(item) for item in items], 200
 
     @jwt_required()
     def post(self):
@@ -31,20 +33,32 @@ class CartResource(Resource):
 
         existing = CartItem.query.filter_by(user_id=user_id, product_id=product.id).first()
         if existing:
-            existing.quantity += quantity
-        else:
-            existing = CartItem(
-                user_id=user_id,
-                product_id=product.id,
-                quantity=quantity,
-                price=product.price,
-                name=product.name,
-                image=product.image_url
-            )
-            db.session.add(existing)
-
-        db.session.commit()
-        return existing.to_dict(), 201
+            # Incremented in SQL so concurrent adds don't overwrite each other
+            existing.quantity = CartItem.quantity + quantity
+            db.session.commit()
+            return cart_item_to_dict(existing), 201
+
+        item = CartItem(
+            user_id=user_id,
+            product_id=product.id,
+            quantity=quantity,
+            price=product.price,
+            name=product.name,
+            image=product.image_url
+        )
+        db.session.add(item)
+        try:
+            db.session.commit()
+        except IntegrityError:
+            # A concurrent request added the same product first; (user_id,
+            # product_id) is unique, so add to its line instead
+            db.session.rollback()
+            item = CartItem.query.filter_by(user_id=user_id, product_id=product_id).first()
+            if item is None:
+                raise
+            item.quantity = CartItem.quantity + quantity
+            db.session.commit()
+        return cart_item_to_dict(item), 201
 
 
 class CartItemResource(Resource):
@@ -67,7 +81,7 @@ class CartItemResource(Resource):
 
         item.quantity = quantity
         db.session.commit()
-        return item.to_dict(), 200
+        return cart_item_to_dict(item), 200
 
     @jwt_required()
     def delete(self, item_id):
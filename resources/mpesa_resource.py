@@ -2,6 +2,7 @@ from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask import request
 from mpesa_stk import lipa_na_mpesa
+from mpesa_jobs import stk_push_queue
 from models import db, Transaction, User
 
 class MpesaSTKPushResource(Resource):
@@ -24,7 +25,19 @@ class MpesaSTKPushResource(Resource):
         # Validate phone number format
         if not isinstance(phone, str) or len(phone) < 10:
             return {'message': 'Invalid phone number'}, 400
-            
+
+        # Async mode: record the transaction now, send the push from the job pool
+        if request.args.get('async', '').lower() == 'true' or data.get('async') is True:
+            transaction = Transaction(phone=phone, amount=amount, user_id=user_id, status='pending')
+            db.session.add(transaction)
+            db.session.commit()
+            stk_push_queue.enqueue(transaction.id)
+            return {
+                'transaction_id': transaction.id,
+                'status': transaction.status,
+                'status_url': f'/api/transactions/{transaction.id}'
+            }, 202
+
         try:
             # Initiate STK push
             response = lipa_na_mpesa(phone, amount, user_id)
@@ -2,70 +2,150 @@ from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask import request
 from models import db, Order, OrderItem, CartItem, Product, Transaction, User
+from serializers import order_summary_to_dict, order_to_dict
+from etag import etag_headers, make_etag, not_modified, version_stamp
 from datetime import datetime
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import selectinload
+from sqlalchemy.orm.attributes import set_committed_value
+from analytics import add_deltas
+from rollups import apply_changes
+from inventory import OutOfStockError, reserve_stock
+from cache import catalog_cache
+from pagination import keyset_page, parse_limit
+
+# Newest first; id breaks ties between orders placed in the same instant
+HISTORY_KEYS = [Order.created_at, Order.id]
+
+
+def _item_total(aggregate):
+    # Correlated per order row, so the page is still read in index order and
+    # only the orders on it are aggregated (a join with GROUP BY sorts them)
+    return select(aggregate).where(OrderItem.order_id == Order.id).correlate(Order).scalar_subquery()
+
+
+def order_summaries():
+    """Order columns plus item count, units and total, one row per order"""
+    return db.session.query(
+        Order.id, Order.status, Order.created_at, Order.customer_id,
+        _item_total(func.count(OrderItem.id)).label('item_count'),
+        _item_total(func.coalesce(func.sum(OrderItem.quantity), 0)).label('units'),
+        _item_total(func.coalesce(func.sum(OrderItem.total_price), 0)).label('total')
+    )
+
 
 class OrderListResource(Resource):
     @jwt_required()
     def get(self):
-        """Get all orders for the current user"""
+        """List the current user's orders newest first, one keyset page at a time
+        (?summary=true returns totals instead of items; ?all=true returns every order)"""
         user_id = get_jwt_identity()
-        orders = Order.query.filter_by(customer_id=user_id).order_by(Order.created_at.desc()).all()
-        return [order.to_dict() for order in orders], 200
+        args = request.args
+        stamp = version_stamp(Order.updated_at, Order.id, Order.customer_id == user_id)
+        etag = make_etag('orders', user_id, tuple(stamp), tuple(sorted(args.items(multi=True))))
+        response = not_modified(etag, private=True)
+        if response is not None:
+            return response
+        headers = etag_headers(etag, private=True)
+
+        if args.get('summary', '').lower() == 'true':
+            query = order_summaries().filter(Order.customer_id == user_id)
+            serialize = order_summary_to_dict
+        else:
+            query = Order.query.filter_by(customer_id=user_id).options(selectinload(Order.items))
+            serialize = order_to_dict
+
+        if args.get('all', '').lower() == 'true':
+            orders = query.order_by(*[key.desc() for key in HISTORY_KEYS]).all()
+            return [serialize(order) for order in orders], 200, headers
+
+        try:
+            limit = parse_limit(args.get('limit'))
+            orders, next_cursor = keyset_page(query, HISTORY_KEYS, args.get('cursor'), limit, descending=True)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+
+        return {
+            'items': [serialize(order) for order in orders],
+            'next_cursor': next_cursor,
+            'limit': limit
+        }, 200, headers
 
     @jwt_required()
     def post(self):
         """Create a new order from the user's cart"""
         user_id = get_jwt_identity()
-        
-        # Get cart items for the user
-        cart_items = CartItem.query.filter_by(user_id=user_id).all()
-        if not cart_items:
+
+        # Cart lines and the user's phone in one query
+        lines = db.session.execute(
+            select(CartItem.product_id, CartItem.quantity, CartItem.price, User.id, User.phone)
+            .outerjoin(User, User.id == CartItem.user_id)
+            .where(CartItem.user_id == user_id)
+            .order_by(CartItem.id)
+        ).all()
+        if not lines:
             return {'message': 'Cart is empty'}, 400
 
+        quantities = {}
+        for line in lines:
+            if line.quantity < 1:
+                return {'message': 'Cart quantities must be at least 1'}, 400
+            quantities[line.product_id] = quantities.get(line.product_id, 0) + line.quantity
+
+        # Reserve stock first, so a checkout that cannot be filled stops
+        # before anything else is written
+        try:
+            reserve_stock(quantities)
+        except OutOfStockError as e:
+            db.session.rollback()
+            return {'message': 'Insufficient stock', 'product_ids': e.product_ids}, 409
+
         # Calculate total price
-        total_price = sum(item.price * item.quantity for item in cart_items)
-
-        # Create new order
-        order = Order(
-            customer_id=user_id,
-            status='pending',
-            created_at=datetime.now()
-        )
-        db.session.add(order)
-        db.session.flush()  # Get order ID
-
-        # Create order items from cart items
-        for cart_item in cart_items:
-            order_item = OrderItem(
-                order_id=order.id,
-                product_id=cart_item.product_id,
-                quantity=cart_item.quantity,
-                unit_price=cart_item.price,
-                total_price=cart_item.price * cart_item.quantity
-            )
-            db.session.add(order_item)
+        total_price = sum(line.price * line.quantity for line in lines)
+
+        # ORM bulk INSERTs: one statement for the order and one multi-row
+        # statement for all of its items, each returning the new rows
+        order = db.session.scalars(
+            insert(Order).returning(Order),
+            [{'customer_id': user_id, 'status': 'pending', 'created_at': datetime.now()}]
+        ).one()
+        items = db.session.scalars(
+            insert(OrderItem).returning(OrderItem),
+            [
+                {
+                    'order_id': order.id,
+                    'product_id': line.product_id,
+                    'quantity': line.quantity,
+                    'unit_price': line.price,
+                    'total_price': line.price * line.quantity
+                }
+                for line in lines
+            ]
+        ).all()
+        set_committed_value(order, 'items', sorted(items, key=lambda item: item.id))
+
+        # Bulk inserts skip the flush hooks that maintain the analytics
+        connection = db.session.connection()
+        add_deltas(connection, {'orders.total': 1, 'orders.status:pending': 1, 'order_items.revenue': total_price})
+        apply_changes(connection, [order.id])
 
         # Create a transaction for the order
-        user = User.query.get(user_id)
-        if user:
-            transaction = Transaction(
+        if lines[0].id is not None:
+            db.session.add(Transaction(
                 user_id=user_id,
-                phone=user.phone if hasattr(user, 'phone') else '',
+                phone=lines[0].phone,
                 amount=total_price,
                 status='pending'
-            )
-            db.session.add(transaction)
-            db.session.flush()  # Get transaction ID
+            ))
 
-        # Clear the cart
-        for cart_item in cart_items:
-            db.session.delete(cart_item)
+        # Clear the cart in a single DELETE
+        CartItem.query.filter_by(user_id=user_id).delete(synchronize_session=False)
 
+        # Serialized before the commit expires the order, so no reload is needed
+        result = order_to_dict(order)
         db.session.commit()
-
-        # Return the created order with items
-        db.session.refresh(order)
-        return order.to_dict(), 201
+        catalog_cache.discard_products(quantities)
+        return result, 201
 
 class OrderResource(Resource):
     @jwt_required()
@@ -73,7 +153,7 @@ class OrderResource(Resource):
         """Get a specific order for the current user"""
         user_id = get_jwt_identity()
         order = Order.query.filter_by(id=order_id, customer_id=user_id).first_or_404()
-        return order.to_dict(), 200
+        return order_to_dict(order), 200
 
     @jwt_required()
     def patch(self, order_id):
@@ -86,4 +166,4 @@ class OrderResource(Resource):
             order.status = data['status']
         
         db.session.commit()
-        return order.to_dict(), 200
+        return order_to_dict(order), 200
@@ -1,7 +1,157 @@
+from flask import request
 from flask_restful import Resource
-from models import Product
+from sqlalchemy import case, func, or_
+from models import Product, Tag, product_load_options
+from pagination import keyset_page, parse_bool, parse_limit, parse_number
+from cache import catalog_cache
+from etag import counter_stamp, etag_headers, make_etag, not_modified
+from search import search_product_ids, terms
+from serializers import product_to_dict
+
+# sort name -> (keyset columns, descending by default)
+SORT_KEYS = {
+    'id': ([Product.id], False),
+    'price': ([Product.price, Product.id], False),
+    'rating': ([func.coalesce(Product.rating, 0), Product.id], True),
+    'popularity': ([func.coalesce(Product.num_reviews, 0), Product.id], True),
+}
+
+
+def filter_products(query, args):
+    """Apply the catalog query-string filters to a Product query in SQL"""
+    category_id = parse_number(args, 'category_id')
+    min_price = parse_number(args, 'min_price', float)
+    max_price = parse_number(args, 'max_price', float)
+    is_popular = parse_bool(args, 'is_popular')
+    in_stock = parse_bool(args, 'in_stock')
+    tag = args.get('tag')
+
+    if category_id is not None:
+        query = query.filter(Product.category_id == category_id)
+    if min_price is not None:
+        query = query.filter(Product.price >= min_price)
+    if max_price is not None:
+        query = query.filter(Product.price <= max_price)
+    if is_popular is not None:
+        query = query.filter(Product.is_popular == is_popular)
+    if in_stock is True:
+        query = query.filter(Product.stock > 0)
+    elif in_stock is False:
+        query = query.filter(or_(Product.stock.is_(None), Product.stock <= 0))
+    if tag:
+        query = query.filter(Product.tags.any(Tag.name == tag))
+    return query
+
+
+def product_facets(query):
+    """Count the filtered products per category in a single GROUP BY"""
+    rows = query.with_entities(
+        Product.category_id,
+        func.count(Product.id),
+        func.sum(case((Product.is_popular.is_(True), 1), else_=0))
+    ).group_by(Product.category_id).all()
+
+    return {
+        'categories': [{'category_id': category_id, 'count': count} for category_id, count, _ in rows],
+        'popular': int(sum(popular or 0 for _, _, popular in rows)),
+        'total': sum(count for _, count, _ in rows)
+    }
+
 
 class ProductListResource(Resource):
     def get(self):
-        products = Product.query.all()
-        return [product.to_dict() for product in products], 200
+        """List products one keyset page at a time (?all=true returns the full catalog)"""
+        args = request.args
+        # Any product insert, update or delete moves the stamp, so it keys
+        # both the ETag and the cached payload
+        stamp = counter_stamp(Product.updated_at, 'products.total')
+        cache_key = (tuple(stamp), tuple(sorted(args.items(multi=True))))
+        etag = make_etag('products', *cache_key)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+        headers = etag_headers(etag)
+
+        cached = catalog_cache.get_listing(cache_key)
+        if cached is not None:
+            return cached, 200, headers
+        generation = catalog_cache.generation
+
+        sort = args.get('sort', 'id')
+        if sort not in SORT_KEYS:
+            return {'message': f"sort must be one of: {', '.join(SORT_KEYS)}"}, 400
+        keys, descending = SORT_KEYS[sort]
+        order = args.get('order')
+        if order:
+            if order not in ('asc', 'desc'):
+                return {'message': 'order must be asc or desc'}, 400
+            descending = order == 'desc'
+
+        try:
+            query = filter_products(Product.query, args)
+            listing = query.options(*product_load_options())
+            if args.get('all', '').lower() == 'true':
+                products = listing.order_by(*[key.desc() if descending else key for key in keys]).all()
+                body = [product_to_dict(product) for product in products]
+                catalog_cache.set_listing(cache_key, body, generation)
+                return body, 200, headers
+
+            limit = parse_limit(args.get('limit'))
+            with_facets = parse_bool(args, 'facets')
+            products, next_cursor = keyset_page(listing, keys, args.get('cursor'), limit, descending)
+        except ValueError as e:
+            return {'message': str(e)}, 400
+
+        body = {
+            'items': [product_to_dict(product) for product in products],
+            'next_cursor': next_cursor,
+            'limit': limit
+        }
+        if with_facets:
+            body['facets'] = product_facets(query)
+        catalog_cache.set_listing(cache_key, body, generation)
+        return body, 200, headers
+
+
+class ProductSearchResource(Resource):
+    def get(self):
+        """Search product names, descriptions and tags, best match first (?q=, ?limit=, ?offset=)"""
+        args = request.args
+        query = args.get('q', '')
+        if not terms(query):
+            return {'message': 'q must contain at least one word'}, 400
+        try:
+            limit = parse_limit(args.get('limit'))
+            offset = parse_number(args, 'offset') or 0
+        except ValueError as e:
+            return {'message': str(e)}, 400
+        if offset < 0:
+            return {'message': 'offset must not be negative'}, 400
+
+        stamp = counter_stamp(Product.updated_at, 'products.total')
+        cache_key = ('search', tuple(stamp), tuple(sorted(args.items(multi=True))))
+        etag = make_etag('products', *cache_key)
+        response = not_modified(etag)
+        if response is not None:
+            return response
+        headers = etag_headers(etag)
+
+        cached = catalog_cache.get_listing(cache_key)
+        if cached is not None:
+            return cached, 200, headers
+        generation = catalog_cache.generation
+
+        ids = search_product_ids(query, limit + 1, offset)
+        more = len(ids) > limit
+        ids = ids[:limit]
+        products = {
+            product.id: product
+            for product in Product.query.options(*product_load_options()).filter(Product.id.in_(ids))
+        }
+        body = {
+            'items': [product_to_dict(products[product_id]) for product_id in ids if product_id in products],
+            'next_offset': offset + limit if more else None,
+            'limit': limit
+        }
+        catalog_cache.set_listing(cache_key, body, generation)
+        return body, 200, headers
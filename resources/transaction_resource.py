@@ -2,14 +2,23 @@ from flask_restful import Resource
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from flask import request
 from models import db, Transaction
+from cache import processed_callbacks
+from serializers import transaction_to_dict
+from etag import etag_headers, make_etag, not_modified, version_stamp
 
 class TransactionResource(Resource):
     @jwt_required()
     def get(self):
         """Get all transactions for the current user"""
         user_id = get_jwt_identity()
+        stamp = version_stamp(Transaction.updated_at, Transaction.id, Transaction.user_id == user_id)
+        etag = make_etag('transactions', user_id, tuple(stamp))
+        response = not_modified(etag, private=True)
+        if response is not None:
+            return response
+
         transactions = Transaction.query.filter_by(user_id=user_id).all()
-        return [transaction.to_dict() for transaction in transactions], 200
+        return [transaction_to_dict(transaction) for transaction in transactions], 200, etag_headers(etag, private=True)
 
 class TransactionDetailResource(Resource):
     @jwt_required()
@@ -22,12 +31,12 @@ class TransactionDetailResource(Resource):
         if transaction.user_id != user_id:
             return {'message': 'Unauthorized'}, 403
             
-        return transaction.to_dict(), 200
+        return transaction_to_dict(transaction), 200
 
 class TransactionCallbackResource(Resource):
     def post(self):
         """Handle M-Pesa callback"""
-        data = request.get_json()
+        data = request.get_json(silent=True) or {}
         
         # Extract relevant information from the callback
         if 'Body' in data and 'stkCallback' in data['Body']:
@@ -35,20 +44,37 @@ class TransactionCallbackResource(Resource):
             checkout_request_id = callback_data.get('CheckoutRequestID')
             result_code = callback_data.get('ResultCode')
             result_desc = callback_data.get('ResultDesc')
-            
-            # Find the transaction by checkout_request_id
-            transaction = Transaction.query.filter_by(checkout_request_id=checkout_request_id).first()
-            
-            if transaction:
-                # Update the transaction with the callback results
-                transaction.result_code = str(result_code)
-                transaction.result_desc = result_desc
-                transaction.status = 'completed' if result_code == 0 else 'failed'
-                
-                db.session.commit()
-                
+
+            if not checkout_request_id:
+                return {'message': 'Invalid callback data'}, 400
+
+            # Safaricom retries callbacks; replays we've already applied stop here
+            if processed_callbacks.get(checkout_request_id):
+                return {'message': 'Callback already processed'}, 200
+
+            # Single conditional UPDATE: only a pending transaction moves to a
+            # terminal state, so concurrent duplicates can't both apply
+            updated = Transaction.query.filter(
+                Transaction.checkout_request_id == checkout_request_id,
+                Transaction.status == 'pending'
+            ).update({
+                'result_code': str(result_code),
+                'result_desc': result_desc,
+                'status': 'completed' if result_code == 0 else 'failed'
+            }, synchronize_session=False)
+            db.session.commit()
+
+            if updated:
+                processed_callbacks.set(checkout_request_id, True)
                 return {'message': 'Transaction updated successfully'}, 200
-            else:
-                return {'message': 'Transaction not found'}, 404
+
+            # Nothing pending: either a replay of a finished transaction or unknown
+            exists = db.session.query(Transaction.id).filter_by(
+                checkout_request_id=checkout_request_id
+            ).first()
+            if exists:
+                processed_callbacks.set(checkout_request_id, True)
+                return {'message': 'Callback already processed'}, 200
+            return {'message': 'Transaction not found'}, 404
         else:
             return {'message': 'Invalid callback data'}, 400
@@ -0,0 +1,243 @@
+"""
+Time-bucketed sales rollups behind /analytics/sales.
+
+sales_rollups holds revenue, order count and units sold per day, ISO week
+(bucketed on its Monday) and month, for all sales (category_id = 0,
+product_id = 0), per category and per product. Whenever a flush creates or
+deletes an order, changes its status or created_at, or adds, changes or
+removes one of its items, the affected orders' contributions are read
+before and after the flush and the difference is added to the rollups in
+the same transaction. Orders in EXCLUDED_STATUSES contribute nothing, so
+cancelling an order subtracts it and reinstating it adds it back.
+
+Bulk inserts and updates of orders bypass these hooks and call
+`apply_changes` themselves. Sales are attributed to a product's current
+category; after moving products between categories, `rebuild_rollups` (flask rebuild-sales-rollups) recomputes the
+table from scratch.
+"""
+from collections import defaultdict
+from datetime import timedelta
+from sqlalchemy import event, inspect, select
+from models import db, SalesRollup, Order, OrderItem, Product
+from analytics import upsert_increment
+
+PERIODS = ('day', 'week', 'month')
+EXCLUDED_STATUSES = frozenset({'cancelled', 'canceled', 'refunded'})
+ALL = 0
+
+rollups = SalesRollup.__table__
+KEYS = ('period', 'category_id', 'product_id', 'bucket')
+
+ORDER_ATTRS = ('status', 'created_at')
+ITEM_ATTRS = ('order_id', 'product_id', 'quantity', 'total_price')
+
+
+def bucket_start(day, period):
+    """First day of the `period` bucket containing `day`"""
+    if period == 'week':
+        return day - timedelta(days=day.weekday())
+    if period == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _lines_query():
+    return (
+        select(Order.id, Order.status, Order.created_at,
+               OrderItem.product_id, Product.category_id, OrderItem.quantity, OrderItem.total_price)
+        .select_from(Order)
+        .outerjoin(OrderItem, OrderItem.order_id == Order.id)
+        .outerjoin(Product, Product.id == OrderItem.product_id)
+    )
+
+
+def _accumulate(totals, order_lines):
+    """Add one order's (status, created_at, lines) to {rollup key: [revenue, orders, units]}"""
+    status, created_at, lines = order_lines
+    if status in EXCLUDED_STATUSES or created_at is None:
+        return
+
+    day = created_at.date()
+    categories, products = set(), set()
+    for period in PERIODS:
+        bucket = bucket_start(day, period)
+        scope = totals[(period, ALL, ALL, bucket)]
+        scope[1] += 1
+        for product_id, category_id, quantity, revenue in lines:
+            scopes = [scope]
+            if category_id is not None:
+                scopes.append(totals[(period, category_id, ALL, bucket)])
+                categories.add(category_id)
+            if product_id is not None:
+                scopes.append(totals[(period, ALL, product_id, bucket)])
+                products.add(product_id)
+            for s in scopes:
+                s[0] += revenue or 0
+                s[2] += quantity or 0
+        # An order counts once per category and product it contains
+        for category_id in categories:
+            totals[(period, category_id, ALL, bucket)][1] += 1
+        for product_id in products:
+            totals[(period, ALL, product_id, bucket)][1] += 1
+        categories.clear()
+        products.clear()
+
+
+def _group_lines(rows):
+    orders = {}
+    for order_id, status, created_at, product_id, category_id, quantity, revenue in rows:
+        _, _, lines = orders.setdefault(order_id, (status, created_at, []))
+        if product_id is not None or quantity is not None:
+            lines.append((product_id, category_id, quantity, revenue))
+    return orders
+
+
+def contributions(connection, order_ids):
+    """{rollup key: [revenue, orders, units]} for the given orders as currently stored"""
+    totals = defaultdict(lambda: [0.0, 0, 0])
+    if order_ids:
+        rows = connection.execute(_lines_query().where(Order.id.in_(order_ids)))
+        for order_lines in _group_lines(rows).values():
+            _accumulate(totals, order_lines)
+    return totals
+
+
+def _old(obj, attr):
+    history = inspect(obj).attrs[attr].history
+    return history.deleted[0] if history.deleted else getattr(obj, attr)
+
+
+def _changed(obj, attrs):
+    state = inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _orders_before_flush(session):
+    ids = set()
+    for obj in session.deleted:
+        if isinstance(obj, Order):
+            ids.add(obj.id)
+        elif isinstance(obj, OrderItem):
+            ids.add(_old(obj, 'order_id'))
+
+    for obj in session.dirty:
+        if isinstance(obj, Order) and _changed(obj, ORDER_ATTRS):
+            ids.add(obj.id)
+        elif isinstance(obj, OrderItem) and _changed(obj, ITEM_ATTRS):
+            ids.update((_old(obj, 'order_id'), obj.order_id))
+
+    for obj in session.new:
+        if isinstance(obj, OrderItem):
+            order = obj.order_id if obj.order_id is not None else obj.order
+            ids.add(order.id if isinstance(order, Order) else order)
+    ids.discard(None)
+    return ids
+
+
+def _orders_after_flush(session, ids):
+    for obj in session.new:
+        if isinstance(obj, Order):
+            ids.add(obj.id)
+        elif isinstance(obj, OrderItem):
+            ids.add(obj.order_id)
+    ids.discard(None)
+    return ids
+
+
+def _difference(after, before):
+    rows = []
+    for key in after.keys() | before.keys():
+        new, old = after.get(key, (0, 0, 0)), before.get(key, (0, 0, 0))
+        delta = [n - o for n, o in zip(new, old)]
+        if any(delta):
+            period, category_id, product_id, bucket = key
+            rows.append({
+                'period': period, 'category_id': category_id, 'product_id': product_id, 'bucket': bucket,
+                'revenue': delta[0], 'orders': delta[1], 'units': delta[2]
+            })
+    return rows
+
+
+@event.listens_for(db.session, 'before_flush')
+def _collect_rollup_changes(session, flush_context, instances):
+    ids = _orders_before_flush(session)
+    before = contributions(session.connection(), ids) if ids else {}
+    session.info['sales_rollup_before'] = (ids, before)
+
+
+@event.listens_for(db.session, 'after_flush')
+def _maintain_rollups(session, flush_context):
+    ids, before = session.info.pop('sales_rollup_before', (set(), {}))
+    ids = _orders_after_flush(session, ids)
+    if ids:
+        apply_changes(session.connection(), ids, before)
+
+
+def apply_changes(connection, order_ids, before=None):
+    """
+    Add the change in `order_ids`' contributions since `before` (from
+    `contributions`; None for orders that did not exist) to the rollups.
+    Bulk inserts and updates of orders bypass the flush hooks and call this.
+    """
+    upsert_increment(connection, rollups, KEYS, _difference(contributions(connection, order_ids), before or {}))
+
+
+def read_sales(period, start, end, category_id=ALL, product_id=ALL):
+    """Rollup rows for one scope between `start` and `end` (inclusive), oldest first"""
+    return db.session.execute(
+        select(rollups.c.bucket, rollups.c.revenue, rollups.c.orders, rollups.c.units)
+        .where(
+            rollups.c.period == period,
+            rollups.c.category_id == category_id,
+            rollups.c.product_id == product_id,
+            rollups.c.bucket.between(bucket_start(start, period), end)
+        )
+        .order_by(rollups.c.bucket)
+    ).all()
+
+
+def read_breakdown(period, start, end, by):
+    """Per-category or per-product totals over the range: [(id, revenue, orders, units)]"""
+    column = rollups.c.category_id if by == 'category' else rollups.c.product_id
+    other = rollups.c.product_id if by == 'category' else rollups.c.category_id
+    totals = defaultdict(lambda: [0.0, 0, 0])
+    for scope_id, revenue, orders, units in db.session.execute(
+        select(column, rollups.c.revenue, rollups.c.orders, rollups.c.units)
+        .where(
+            rollups.c.period == period,
+            column != ALL,
+            other == ALL,
+            rollups.c.bucket.between(bucket_start(start, period), end)
+        )
+    ):
+        t = totals[scope_id]
+        t[0] += revenue
+        t[1] += orders
+        t[2] += units
+    return sorted(((scope_id, *t) for scope_id, t in totals.items()), key=lambda row: -row[1])
+
+
+def rebuild_rollups(batch_size=2000):
+    """Replace sales_rollups with totals recomputed from orders and order items"""
+    totals = defaultdict(lambda: [0.0, 0, 0])
+    current, lines = None, None
+    rows = db.session.execute(
+        _lines_query().order_by(Order.id).execution_options(yield_per=batch_size)
+    )
+    for order_id, status, created_at, product_id, category_id, quantity, revenue in rows:
+        if order_id != current:
+            if current is not None:
+                _accumulate(totals, lines)
+            current, lines = order_id, (status, created_at, [])
+        if product_id is not None or quantity is not None:
+            lines[2].append((product_id, category_id, quantity, revenue))
+    if current is not None:
+        _accumulate(totals, lines)
+
+    connection = db.session.connection()
+    connection.execute(rollups.delete())
+    new_rows = _difference(totals, {})
+    if new_rows:
+        connection.execute(rollups.insert(), new_rows)
+    db.session.commit()
+    return len(new_rows)
@@ -0,0 +1,89 @@
+"""
+URL map, grouped into one blueprint per area.
+
+With LAZY_RESOURCES on (the default) each route is bound to a stand-in
+resource that imports the real one on its first request, so starting a
+worker does not import every resource module and what they pull in
+(requests, the M-Pesa client, the admin dashboard queries).
+"""
+import threading
+from importlib import import_module
+from flask import Blueprint, request
+from flask_restful import Api, Resource
+from werkzeug.exceptions import MethodNotAllowed
+
+BLUEPRINTS = {
+    'auth': [
+        ('resources.auth:AuthResource', '/auth/<string:action>'),
+    ],
+    'shop': [
+        ('resources.cart:CartResource', '/api/cart'),
+        ('resources.cart:CartItemResource', '/api/cart/<int:item_id>'),
+        ('resources.product_resource:ProductListResource', '/api/products'),
+        ('resources.product_resource:ProductSearchResource', '/api/products/search'),
+        ('resources.order_resource:OrderListResource', '/api/orders'),
+        ('resources.order_resource:OrderResource', '/api/orders/<int:order_id>'),
+    ],
+    'payments': [
+        ('resources.transaction_resource:TransactionResource', '/api/transactions'),
+        ('resources.transaction_resource:TransactionDetailResource', '/api/transactions/<int:transaction_id>'),
+        ('resources.transaction_resource:TransactionCallbackResource', '/api/transactions/callback'),
+        ('resources.mpesa_resource:MpesaSTKPushResource', '/api/mpesa/stkpush'),
+    ],
+    'analytics': [
+        ('resources.analytics_resource:UserAnalyticsResource', '/analytics/users'),
+        ('resources.analytics_resource:TicketStatusAnalyticsResource', '/analytics/tickets/status'),
+        ('resources.analytics_resource:ProductStatusAnalyticsResource', '/analytics/products/status'),
+        ('resources.analytics_resource:SalesAnalyticsResource', '/analytics/sales'),
+    ],
+    'admin': [
+        ('resources.admin_resource:AdminDashboardResource', '/admin/dashboard'),
+        ('resources.admin_resource:AdminUserResource', '/admin/users', '/admin/users/<int:user_id>'),
+        ('resources.admin_resource:AdminProductResource', '/admin/products', '/admin/products/<int:product_id>'),
+        ('resources.admin_resource:AdminOrderResource', '/admin/orders', '/admin/orders/<int:order_id>'),
+        ('resources.admin_resource:AdminTicketResource', '/admin/tickets', '/admin/tickets/<int:ticket_id>'),
+        ('resources.admin_resource:AdminMetricsResource', '/admin/metrics'),
+    ],
+}
+
+_resolved = {}
+_lock = threading.Lock()
+
+
+def resolve(target):
+    """'module:Class' -> the resource class, imported on first use"""
+    resource = _resolved.get(target)
+    if resource is None:
+        with _lock:
+            if target not in _resolved:
+                module, name = target.split(':')
+                _resolved[target] = getattr(import_module(module), name)
+            resource = _resolved[target]
+    return resource
+
+
+class LazyResource(Resource):
+    """Stand-in that forwards each request to the resource named by `target`"""
+    target = None
+    methods = {'GET', 'POST', 'PUT', 'PATCH', 'DELETE'}
+
+    def dispatch_request(self, *args, **kwargs):
+        resource = resolve(self.target)
+        allowed = resource.methods | ({'HEAD'} if 'GET' in resource.methods else set())
+        if request.method not in allowed:
+            raise MethodNotAllowed(valid_methods=sorted(allowed))
+        return resource().dispatch_request(*args, **kwargs)
+
+
+def lazy_resource(target):
+    name = target.split(':')[1]
+    return type(name, (LazyResource,), {'target': target})
+
+
+def register_routes(app, lazy=True):
+    for name, routes in BLUEPRINTS.items():
+        blueprint = Blueprint(name, __name__)
+        api = Api(blueprint)
+        for target, *urls in routes:
+            api.add_resource(lazy_resource(target) if lazy else resolve(target), *urls)
+        app.register_blueprint(blueprint)
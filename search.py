@@ -0,0 +1,195 @@
+"""
+Full-text product search behind /api/products/search.
+
+product_search is an inverted index over each product's name, tags,
+short description and description, keyed by product id:
+
+- SQLite: an FTS5 table (rowid = product id) ranked with bm25().
+- PostgreSQL: a weighted tsvector per product with a GIN index, ranked
+  with ts_rank_cd(). The 'simple' configuration keeps words unstemmed,
+  matching SQLite's unicode61 tokenizer.
+
+Every flush that adds or deletes a product, changes one of the indexed
+fields or its tags, or renames a tag rewrites the affected entries in the
+same transaction. Query words are matched as prefixes and must all occur.
+The table is created with `products` by db.create_all() and by migration
+d6e1b3f8c2a4; `rebuild_search_index` (flask rebuild-search-index) refills
+it from scratch. Other databases fall back to unranked LIKE matching.
+"""
+import re
+from collections import defaultdict
+from sqlalchemy import DDL, event, inspect, or_, select, text
+from models import db, Product, Tag, product_tags
+
+FIELDS = ('name', 'short_description', 'description')
+MAX_TERMS = 8
+
+# FTS5 column weights for bm25(), in column order: name, short_description,
+# description, tags
+SQLITE_WEIGHTS = (10.0, 4.0, 1.0, 6.0)
+
+SQLITE_CREATE = (
+    "CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5("
+    "name, short_description, description, tags, "
+    "tokenize = 'unicode61 remove_diacritics 2', prefix = '2 3')"
+)
+POSTGRES_CREATE = (
+    "CREATE TABLE IF NOT EXISTS product_search ("
+    "product_id INTEGER PRIMARY KEY REFERENCES products (id) ON DELETE CASCADE, "
+    "document TSVECTOR NOT NULL)"
+)
+POSTGRES_CREATE_INDEX = (
+    "CREATE INDEX IF NOT EXISTS ix_product_search_document ON product_search USING GIN (document)"
+)
+
+# name, tags, short_description, description weigh A, B, C, D
+POSTGRES_UPSERT = text(
+    "INSERT INTO product_search (product_id, document) VALUES (:id, "
+    "setweight(to_tsvector('simple', :name), 'A') || "
+    "setweight(to_tsvector('simple', :tags), 'B') || "
+    "setweight(to_tsvector('simple', :short_description), 'C') || "
+    "setweight(to_tsvector('simple', :description), 'D')) "
+    "ON CONFLICT (product_id) DO UPDATE SET document = excluded.document"
+)
+SQLITE_INSERT = text(
+    "INSERT INTO product_search (rowid, name, short_description, description, tags) "
+    "VALUES (:id, :name, :short_description, :description, :tags)"
+)
+
+# Created and dropped together with products, so create_all()/drop_all()
+# (benchmarks, fresh development databases) manage it too
+event.listen(Product.__table__, 'after_create', DDL(SQLITE_CREATE).execute_if(dialect='sqlite'))
+event.listen(Product.__table__, 'after_create', DDL(POSTGRES_CREATE).execute_if(dialect='postgresql'))
+event.listen(Product.__table__, 'after_create', DDL(POSTGRES_CREATE_INDEX).execute_if(dialect='postgresql'))
+event.listen(Product.__table__, 'before_drop', DDL("DROP TABLE IF EXISTS product_search")
+             .execute_if(dialect=('sqlite', 'postgresql')))
+
+
+def terms(query):
+    """Lowercased words of a search query, at most MAX_TERMS"""
+    return re.findall(r'\w+', query.lower())[:MAX_TERMS]
+
+
+def _documents(connection, product_ids):
+    """Indexed text of each product, read from the database as it is now"""
+    tags = defaultdict(list)
+    for product_id, name in connection.execute(
+        select(product_tags.c.product_id, Tag.name)
+        .join(Tag, Tag.id == product_tags.c.tag_id)
+        .where(product_tags.c.product_id.in_(product_ids))
+    ):
+        tags[product_id].append(name)
+    return [
+        {'id': row.id, **{field: row[i + 1] or '' for i, field in enumerate(FIELDS)},
+         'tags': ' '.join(sorted(tags[row.id]))}
+        for row in connection.execute(
+            select(Product.id, *[getattr(Product, field) for field in FIELDS])
+            .where(Product.id.in_(product_ids))
+        )
+    ]
+
+
+def _remove(connection, product_ids):
+    column = 'rowid' if connection.dialect.name == 'sqlite' else 'product_id'
+    ids = ','.join(str(int(product_id)) for product_id in product_ids)
+    connection.execute(text(f"DELETE FROM product_search WHERE {column} IN ({ids})"))
+
+
+def refresh_entries(connection, product_ids):
+    """Rewrite the index entries of `product_ids`; deleted products lose theirs"""
+    product_ids = sorted(set(product_ids))
+    if not product_ids:
+        return
+    rows = _documents(connection, product_ids)
+    if connection.dialect.name == 'sqlite':
+        _remove(connection, product_ids)
+        if rows:
+            connection.execute(SQLITE_INSERT, rows)
+    else:
+        found = {row['id'] for row in rows}
+        missing = [product_id for product_id in product_ids if product_id not in found]
+        if missing:
+            _remove(connection, missing)
+        if rows:
+            connection.execute(POSTGRES_UPSERT, rows)
+
+
+def _indexed_change(obj, attrs):
+    state = inspect(obj)
+    return any(state.attrs[attr].history.has_changes() for attr in attrs)
+
+
+def _supported(session):
+    return session.connection().dialect.name in ('sqlite', 'postgresql')
+
+
+@event.listens_for(db.session, 'before_flush')
+def _collect_tag_changes(session, flush_context, instances):
+    # Renamed or deleted tags: their products are only known before the flush
+    ids = set()
+    for obj in session.dirty | session.deleted:
+        if isinstance(obj, Tag) and (obj in session.deleted or _indexed_change(obj, ('name',))):
+            ids.update(product.id for product in obj.products if product.id is not None)
+    session.info['search_tag_products'] = ids
+
+
+@event.listens_for(db.session, 'after_flush')
+def _sync_search_index(session, flush_context):
+    ids = session.info.pop('search_tag_products', set())
+    for obj in session.new | session.deleted:
+        if isinstance(obj, Product):
+            ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, Product) and _indexed_change(obj, FIELDS + ('tags',)):
+            ids.add(obj.id)
+    ids.discard(None)
+    if ids and _supported(session):
+        refresh_entries(session.connection(), ids)
+
+
+def search_product_ids(query, limit, offset=0):
+    """Ids of the products matching every word of `query` as a prefix, best match first"""
+    words = terms(query)
+    if not words:
+        return []
+    connection = db.session.connection()
+    dialect = connection.dialect.name
+
+    if dialect == 'sqlite':
+        weights = ', '.join(str(weight) for weight in SQLITE_WEIGHTS)
+        rows = connection.execute(text(
+            f"SELECT rowid FROM product_search WHERE product_search MATCH :match "
+            f"ORDER BY bm25(product_search, {weights}), rowid LIMIT :limit OFFSET :offset"
+        ), {'match': ' '.join(f'"{word}"*' for word in words), 'limit': limit, 'offset': offset})
+    elif dialect == 'postgresql':
+        rows = connection.execute(text(
+            "SELECT product_id FROM product_search, to_tsquery('simple', :match) AS query "
+            "WHERE document @@ query "
+            "ORDER BY ts_rank_cd(document, query) DESC, product_id LIMIT :limit OFFSET :offset"
+        ), {'match': ' & '.join(f'{word}:*' for word in words), 'limit': limit, 'offset': offset})
+    else:
+        matches = [
+            or_(*[getattr(Product, field).ilike(f'%{word}%') for field in FIELDS],
+                Product.tags.any(Tag.name.ilike(f'%{word}%')))
+            for word in words
+        ]
+        rows = db.session.execute(
+            select(Product.id).where(*matches).order_by(Product.id).limit(limit).offset(offset)
+        )
+    return [row[0] for row in rows]
+
+
+def rebuild_search_index(batch_size=2000):
+    """Refill product_search from the products table; returns the number of entries"""
+    if not _supported(db.session):
+        return 0
+    connection = db.session.connection()
+    connection.execute(text("DELETE FROM product_search"))
+    ids = connection.execute(select(Product.id).order_by(Product.id)).scalars().all()
+    for start in range(0, len(ids), batch_size):
+        refresh_entries(connection, ids[start:start + batch_size])
+    if connection.dialect.name == 'sqlite':
+        # Merge the index segments written by the batches
+        connection.execute(text("INSERT INTO product_search (product_search) VALUES ('optimize')"))
+    db.session.commit()
+    return len(ids)
@@ -1,6 +1,8 @@
-from app import app
+from app import create_app
 from models import db, Product, Category, User
 
+app = create_app()
+
 # ===========================
 # 1. Add Admin User
 # ===========================
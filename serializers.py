@@ -0,0 +1,107 @@
+"""
+Precompiled serializers for the hot list endpoints.
+
+SerializerMixin.to_dict rebuilds its schema from serialize_only/serialize_rules
+and type-dispatches every value on every call. The functions here read the
+same serialize_only tuples once, at import time, and compile them into a fixed
+projection: one attrgetter for the plain fields plus a short list of nested
+getters. Output matches to_dict() for the models below.
+"""
+from datetime import datetime
+from operator import attrgetter
+
+from sqlalchemy import DateTime, inspect
+from sqlalchemy_serializer import SerializerMixin
+
+from models import Product, Order, OrderItem, CartItem, Transaction, User, SupportTicket, DashboardSnapshot
+
+DATETIME_FORMAT = SerializerMixin.datetime_format
+
+
+def _format_datetime(value):
+    return value.strftime(DATETIME_FORMAT) if isinstance(value, datetime) else value
+
+
+def _datetime_field(name):
+    getter = attrgetter(name)
+    return lambda obj: _format_datetime(getter(obj))
+
+
+def _nested_field(name, serializer, uselist):
+    getter = attrgetter(name)
+    if uselist:
+        return lambda obj: [serializer(child) for child in getter(obj)]
+
+    def convert(obj):
+        child = getter(obj)
+        return None if child is None else serializer(child)
+    return convert
+
+
+def compile_serializer(model, only=None):
+    """Compile `only` (default: model.serialize_only) into a row -> dict function"""
+    only = only or model.serialize_only
+    relationships = inspect(model).relationships
+    columns = model.__table__.c
+
+    plain, converters, nested = [], [], {}
+    for field in only:
+        name, _, rest = field.partition('.')
+        if name in relationships:
+            nested.setdefault(name, [])
+            if rest:
+                nested[name].append(rest)
+        elif name in columns and isinstance(columns[name].type, DateTime):
+            converters.append((name, _datetime_field(name)))
+        else:
+            plain.append(name)
+
+    for name, fields in nested.items():
+        relationship = relationships[name]
+        child = compile_serializer(relationship.mapper.class_, tuple(fields) or None)
+        converters.append((name, _nested_field(name, child, relationship.uselist)))
+
+    keys = tuple(plain)
+    get_plain = attrgetter(*keys)
+    converters = tuple(converters)
+
+    if len(keys) == 1:
+        key = keys[0]
+
+        def serialize(obj):
+            data = {key: get_plain(obj)}
+            for name, convert in converters:
+                data[name] = convert(obj)
+            return data
+    else:
+        def serialize(obj):
+            data = dict(zip(keys, get_plain(obj)))
+            for name, convert in converters:
+                data[name] = convert(obj)
+            return data
+
+    serialize.__name__ = f'{model.__name__.lower()}_to_dict'
+    return serialize
+
+
+user_to_dict = compile_serializer(User)
+product_to_dict = compile_serializer(Product)
+order_item_to_dict = compile_serializer(OrderItem)
+order_to_dict = compile_serializer(Order)
+cart_item_to_dict = compile_serializer(CartItem)
+transaction_to_dict = compile_serializer(Transaction)
+ticket_to_dict = compile_serializer(SupportTicket)
+dashboard_snapshot_to_dict = compile_serializer(DashboardSnapshot)
+
+
+def order_summary_to_dict(row):
+    """An order row with the item totals computed in SQL, in place of its items"""
+    return {
+        'id': row.id,
+        'status': row.status,
+        'created_at': _format_datetime(row.created_at),
+        'customer_id': row.customer_id,
+        'item_count': row.item_count,
+        'units': row.units,
+        'total': row.total
+    }